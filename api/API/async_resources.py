@@ -0,0 +1,64 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse, HttpResponseNotAllowed
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from api.API.resources import client_sessions, sessions_in_time, listing_key
+from api.API.serializers import SessionSerializer
+from cinema import listing_cache
+
+# Database work of the async views runs here, so a burst of readers can hold at most this many connections
+executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix="api-db")
+
+
+def run_sync(function, *args):
+    def call():
+        try:
+            return function(*args)
+        finally:
+            close_old_connections()
+    return asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+def client_session_data(request, url_date, sort):
+    key = listing_key(request, url_date, sort)
+    data = listing_cache.fetch(key)
+    if data is None:
+        request = Request(request)
+        pagination = LimitOffsetPagination()
+        page = pagination.paginate_queryset(client_sessions(url_date, sort), request)
+        serializer = SessionSerializer(page, many=True, context={"request": request})
+        data = pagination.get_paginated_response(serializer.data).data
+        listing_cache.store(key, data)
+    return data
+
+
+def sessions_in_time_data(hall, start_range, end_range):
+    return SessionSerializer(sessions_in_time(hall, start_range, end_range), many=True).data
+
+
+async def conditional_response(request, url_date, function, *args):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    etag = quote_etag(await run_sync(listing_cache.listing_etag, url_date))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(await run_sync(function, *args), safe=False)
+    response["ETag"] = etag
+    return response
+
+
+async def client_session_list(request, date, sort=None):
+    return await conditional_response(request, date, client_session_data, request, date, sort)
+
+
+async def today_session_list(request, start_range=None, end_range=None, hall=None):
+    if hall is not None:
+        # The hall is loaded off the event loop, a missing one answers 404 like the sync route
+        await run_sync(getattr, hall, "name")
+    return await conditional_response(request, date.today(), sessions_in_time_data, hall, start_range, end_range)
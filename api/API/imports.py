@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+from cinema.models import Hall, Session
+from api.API.serializers import SessionImportSerializer
+
+
+def parse_sessions(content, format):
+    if format == "csv":
+        return list(csv.DictReader(io.StringIO(content)))
+    return json.loads(content)
+
+
+def import_sessions(rows):
+    errors = []
+    sessions = []
+    row_numbers = []
+    serializers = [SessionImportSerializer(data=row) for row in rows]
+    valid = [serializer.is_valid() for serializer in serializers]
+    halls = set(Hall.objects.filter(id__in={serializer.validated_data["hall"]
+                                            for serializer, is_valid in zip(serializers, valid) if is_valid})
+                .values_list("id", flat=True))
+    for number, (serializer, is_valid) in enumerate(zip(serializers, valid), start=1):
+        if not is_valid:
+            errors.append({"row": number, "errors": serializer.errors})
+        elif serializer.validated_data["hall"] not in halls:
+            errors.append({"row": number, "errors": {"hall": ["Hall does not exist"]}})
+        else:
+            data = dict(serializer.validated_data)
+            data["hall_id"] = data.pop("hall")
+            sessions.append(Session(**data))
+            row_numbers.append(number)
+
+    if errors:
+        conflicts = Session.find_conflicts(sessions)
+    else:
+        conflicts = Session.import_many(sessions)
+
+    report = {"created": 0, "errors": errors, "conflicts": []}
+    for index, other_index, other in conflicts:
+        conflict = {"row": row_numbers[index]}
+        if other_index is None:
+            conflict["session"] = other.id
+        else:
+            conflict["collides_with_row"] = row_numbers[other_index]
+        report["conflicts"].append(conflict)
+    if not errors and not conflicts:
+        report["created"] = len(sessions)
+    return report
@@ -1,18 +1,28 @@
 from datetime import date
 from rest_framework import viewsets, mixins
-from cinema.models import Hall, Session, BookedSession
+from cinema.models import Hall, Session, BookedSession, SeatHold, SessionDay
 from customuser.models import MyUser
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Sum, F
-from django.db.models.functions import Coalesce
+from django.utils.decorators import method_decorator
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.permissions import AllowAny
 from api.API.serializers import HallSerializer, SessionSerializer, MyUserSerializer, \
-    BookedSessionSerializer, UserInfoBookedSessionsSerializer
-from api.misc import IsAdmin
-from cinema import exceptions
+    BookedSessionSerializer, UserInfoBookedSessionsSerializer, BookedSessionBatchSerializer, SeatHoldSerializer, \
+    ExpandedBookedSessionsSerializer
+from api.misc import IsAdmin, idempotent, KeysetPagination
+from cinema import exceptions, listing_cache, exports
 from api.misc import ExpiringTokenAuthentication
+from api.API.imports import parse_sessions, import_sessions
+
+BOOKING_FAIL_MESSAGES = {
+    exceptions.NoFreePlacesException: "Not enough free places",
+    exceptions.IncorrectDataException: "Incorrect data",
+    exceptions.NotEnoughMoneyException: "Not enough money",
+    exceptions.DateExpiredException: "Date expired",
+    exceptions.HoldExpiredException: "Hold expired",
+}
+AVAILABILITY_MAX_DAYS = 31
 
 
 class HallViewSet(mixins.ListModelMixin,
@@ -67,6 +77,48 @@ class SessionViewSet(mixins.ListModelMixin,
         except exceptions.SessionsCollideException:
             return Response(data={"fail_message": "Session collides with another one"}, status=400)
 
+    @action(methods=["post"], detail=False, url_path="import")
+    def import_sessions(self, request, *args, **kwargs):
+        file = request.FILES.get("file", None)
+        try:
+            if file:
+                rows = parse_sessions(file.read().decode(), "csv" if file.name.endswith(".csv") else "json")
+            else:
+                rows = request.data["sessions"]
+        except (KeyError, ValueError):
+            return Response(data={"fail_message": "Incorrect data"}, status=400)
+        if not isinstance(rows, list):
+            return Response(data={"fail_message": "Incorrect data"}, status=400)
+        report = import_sessions(rows)
+        if report["errors"] or report["conflicts"]:
+            report["fail_message"] = "Sessions were not imported"
+            return Response(data=report, status=400)
+        report["success_message"] = "Sessions were imported"
+        return Response(data=report, status=201)
+
+
+def client_sessions(url_date, sort=None):
+    queryset = Session.objects.running_on(url_date).with_free_places()
+    sort_options = ["start_time", "price"]
+    if sort in sort_options:
+        queryset = queryset.order_by(sort)
+    return queryset
+
+
+def sessions_in_time(hall=None, start_range=None, end_range=None):
+    queryset = Session.objects.running_on(date.today())
+    if hall:
+        queryset = queryset.filter(hall=hall)
+    if start_range and end_range:
+        queryset = queryset.filter(start_time__gte=start_range, start_time__lte=end_range)
+    return queryset
+
+
+def listing_key(request, url_date, sort=None):
+    # Pagination links are absolute, so the host is part of the key as well
+    return listing_cache.make_key("api", url_date, sort, request.get_host(),
+                                  request.GET.get("limit"), request.GET.get("offset"))
+
 
 class ClientSessionView(mixins.ListModelMixin, viewsets.GenericViewSet):
     queryset = Session.objects.all()
@@ -74,33 +126,30 @@ class ClientSessionView(mixins.ListModelMixin, viewsets.GenericViewSet):
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        url_date = self.kwargs["date"]
-        booked_sessions = BookedSession.objects.filter(date=url_date).values("session")
-        booked_sessions = queryset.filter(pk__in=booked_sessions). \
-            annotate(free_places=F("hall__size") - Coalesce(Sum(F("booked_sessions__places")), 0))
-        # print(booked_sessions.values())
-        queryset = queryset.filter(start_date__lte=url_date, end_date__gte=url_date).exclude(pk__in=booked_sessions).\
-            annotate(free_places=F("hall__size"))
-        # print(queryset.values())
-        queryset = booked_sessions.union(queryset)
-        # print(queryset.values())
-        sort_options = ["start_time", "price"]
-        sort = self.kwargs.get("sort", None)
-        if sort in sort_options:
-            queryset = queryset.order_by(sort)
-        return queryset
+        return client_sessions(self.kwargs["date"], self.kwargs.get("sort", None))
+
+    @method_decorator(listing_cache.conditional(lambda kwargs: kwargs["date"]))
+    def list(self, request, *args, **kwargs):
+        key = listing_key(request, self.kwargs["date"], self.kwargs.get("sort", None))
+        data = listing_cache.fetch(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            listing_cache.store(key, data)
+        return Response(data=data, status=200)
+
+    @action(methods=["get"], detail=False)
+    def availability(self, request, *args, **kwargs):
+        start_date = self.kwargs["start_date"]
+        end_date = self.kwargs["end_date"]
+        if start_date > end_date or (end_date - start_date).days >= AVAILABILITY_MAX_DAYS:
+            return Response(data={"fail_message": "Incorrect date range"}, status=400)
+        return Response(data=SessionDay.availability(start_date, end_date), status=200)
 
     @action(methods=["get"], detail=False)
+    @method_decorator(listing_cache.conditional(lambda kwargs: date.today()))
     def get_sessions_in_time(self, request, *args, **kwargs):
-        hall = self.kwargs.get("hall", None)
-        start_range = self.kwargs.get("start_range", None)
-        end_range = self.kwargs.get("end_range", None)
-        queryset = Session.objects.filter(start_date__lte=date.today(), end_date__gte=date.today())
-        if hall:
-            queryset = queryset.filter(hall=hall)
-        if start_range and end_range:
-            queryset = queryset.filter(start_time__gte=start_range, start_time__lte=end_range)
+        queryset = sessions_in_time(self.kwargs.get("hall", None), self.kwargs.get("start_range", None),
+                                    self.kwargs.get("end_range", None))
         data = SessionSerializer(queryset, many=True).data
         return Response(data=data, status=200)
 
@@ -125,19 +174,80 @@ class BookedSessionViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, views
     def perform_create(self, serializer):
         serializer.save(user=self.request.user, session=self.kwargs["s"], date=self.kwargs["date"])
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             response = super().create(request, *args, **kwargs)
             response.data["success_message"] = "Session was booked"
             return response
-        except exceptions.NoFreePlacesException:
-            return Response(status=400, data={"fail_message": "Not enough free places"})
-        except exceptions.IncorrectDataException:
-            return Response(status=400, data={"fail_message": "Incorrect data"})
-        except exceptions.NotEnoughMoneyException:
-            return Response(status=400, data={"fail_message": "Not enough money"})
-        except exceptions.DateExpiredException:
-            return Response(status=400, data={"fail_message": "Date expired"})
+        except tuple(BOOKING_FAIL_MESSAGES) as e:
+            return Response(status=400, data={"fail_message": BOOKING_FAIL_MESSAGES[type(e)]})
+
+    @action(methods=["post"], detail=False)
+    @idempotent
+    def create_many(self, request, *args, **kwargs):
+        serializer = BookedSessionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data["items"]
+        sessions = Session.objects.select_related("hall").in_bulk({item["session"] for item in items})
+        booked_sessions = [BookedSession(session=sessions.get(item["session"]), date=item["date"],
+                                         places=item["places"]) for item in items]
+
+        errors = BookedSession.check_many(request.user, booked_sessions)
+        if not any(errors):
+            try:
+                BookedSession.book_many(request.user, booked_sessions)
+            except tuple(BOOKING_FAIL_MESSAGES) as e:
+                # Seats or money were taken by a concurrent request after the check
+                errors = [e] * len(items)
+
+        results = []
+        for item, error in zip(items, errors):
+            result = dict(item, success=error is None)
+            if error:
+                result["fail_message"] = BOOKING_FAIL_MESSAGES[type(error)]
+            results.append(result)
+        if any(errors):
+            return Response(status=400, data={"results": results, "fail_message": "Sessions were not booked"})
+        return Response(status=201, data={"results": results, "success_message": "Sessions were booked"})
+
+
+class SeatHoldViewSet(mixins.CreateModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [ExpiringTokenAuthentication]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return queryset.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user, session=self.kwargs["s"], date=self.kwargs["date"])
+
+    def perform_destroy(self, instance):
+        instance.release()
+
+    def create(self, request, *args, **kwargs):
+        try:
+            response = super().create(request, *args, **kwargs)
+            response.data["success_message"] = "Places were held"
+            return response
+        except tuple(BOOKING_FAIL_MESSAGES) as e:
+            return Response(status=400, data={"fail_message": BOOKING_FAIL_MESSAGES[type(e)]})
+
+    @action(methods=["post"], detail=True)
+    def confirm(self, request, *args, **kwargs):
+        hold = self.get_object()
+        try:
+            booked_session = hold.confirm()
+        except tuple(BOOKING_FAIL_MESSAGES) as e:
+            # A hold that can't be paid for gives its seats back right away instead of at expiry
+            hold.release()
+            return Response(status=400, data={"fail_message": BOOKING_FAIL_MESSAGES[type(e)]})
+        data = UserInfoBookedSessionsSerializer(booked_session).data
+        data["success_message"] = "Session was booked"
+        return Response(status=201, data=data)
 
 
 class BookedSessionListViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
@@ -145,18 +255,41 @@ class BookedSessionListViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     serializer_class = UserInfoBookedSessionsSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [ExpiringTokenAuthentication]
+    pagination_class = KeysetPagination
+    keyset_ordering = ["date", "id"]
+
+    def expanded(self):
+        return self.request.query_params.get("expand") == "session"
+
+    def get_serializer_class(self):
+        if self.expanded():
+            return ExpandedBookedSessionsSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        queryset = queryset.filter(user=self.request.user)
-        self.total_spent = queryset.aggregate(total=Sum(F("session__price") * F("places")))["total"]
-        if not self.total_spent:
-            self.total_spent = 0
+        queryset = super().get_queryset().filter(user=self.request.user)
+        if self.expanded():
+            queryset = queryset.select_related("session__hall")
         return queryset
 
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
-        response.data["results"].append({"total_spent": self.total_spent})
-        response.data["results"].append({"current_money": self.request.user.wallet})
+        response.data["summary"] = {"total_spent": request.user.total_spent, "current_money": request.user.wallet}
+        if not self.expanded():
+            # Older clients read the totals from the last rows of the results
+            response.data["results"].append({"total_spent": request.user.total_spent})
+            response.data["results"].append({"current_money": request.user.wallet})
         return response
 
+    def export(self, request, export_format):
+        return exports.export_response(self.get_queryset(), export_format, "my-booked-sessions")
+
+
+class BookedSessionExportViewSet(viewsets.GenericViewSet):
+    queryset = BookedSession.objects.all()
+    permission_classes = [IsAdmin]
+    authentication_classes = [ExpiringTokenAuthentication]
+
+    def export(self, request, export_format):
+        return exports.export_response(self.get_queryset(), export_format, "booked-sessions")
+
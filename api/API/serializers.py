@@ -1,10 +1,19 @@
 from rest_framework import serializers
 from django.core.validators import MinValueValidator
 from django.utils.timezone import now
-from cinema.models import Hall, Session, BookedSession
+from cinema.models import Hall, Session, BookedSession, SeatHold, ALL_WEEKDAYS
 from customuser.models import MyUser
 
 
+def check_session_dates(start_date, end_date, start_time, end_time):
+    cond1 = start_date > end_date
+    cond2 = start_date == end_date
+    cond3 = start_time >= end_time
+    cond4 = end_date < now().date()
+    if cond1 or cond2 and cond3 or cond4:
+        raise serializers.ValidationError("Incorrect date")
+
+
 class HallSerializer(serializers.ModelSerializer):
     class Meta:
         model = Hall
@@ -40,17 +49,11 @@ class SessionSerializer(serializers.ModelSerializer):
         end_date = data.get("end_date", None) or self.instance.end_date
         start_time = data.get("start_time", None) or self.instance.start_time
         end_time = data.get("end_time", None) or self.instance.end_time
-        cond1 = start_date > end_date
-        cond2 = start_date == end_date
-        cond3 = start_time >= end_time
-        cond4 = end_date < now().date()
-        if cond1 or cond2 and cond3 or cond4:
-            raise serializers.ValidationError("Incorrect date")
-
+        check_session_dates(start_date, end_date, start_time, end_time)
         return data
 
     class Meta:
-        fields = ["id", "start_date", "end_date", "start_time", "end_time", "hall", "price", "free_places"]
+        fields = ["id", "start_date", "end_date", "start_time", "end_time", "weekdays", "hall", "price", "free_places"]
         model = Session
 
 
@@ -61,8 +64,57 @@ class BookedSessionSerializer(serializers.ModelSerializer):
         fields = ["places"]
 
 
+class SessionImportSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    weekdays = serializers.IntegerField(min_value=1, max_value=ALL_WEEKDAYS, default=ALL_WEEKDAYS)
+    hall = serializers.IntegerField()
+    price = serializers.IntegerField(validators=[MinValueValidator(0)])
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        check_session_dates(data["start_date"], data["end_date"], data["start_time"], data["end_time"])
+        return data
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = SeatHold
+        fields = ["id", "session", "date", "places", "expires"]
+        read_only_fields = ["id", "session", "date", "expires"]
+
+
+class BookedSessionItemSerializer(serializers.Serializer):
+    session = serializers.IntegerField()
+    date = serializers.DateField()
+    places = serializers.IntegerField(validators=[MinValueValidator(1)])
+
+
+class BookedSessionBatchSerializer(serializers.Serializer):
+    items = BookedSessionItemSerializer(many=True, allow_empty=False)
+
+
 class UserInfoBookedSessionsSerializer(serializers.ModelSerializer):
 
     class Meta:
         fields = ["date", "session", "places"]
         model = BookedSession
+
+
+class SessionInfoSerializer(serializers.ModelSerializer):
+    hall = HallSerializer(read_only=True)
+
+    class Meta:
+        fields = ["id", "start_date", "end_date", "start_time", "end_time", "price", "hall"]
+        model = Session
+
+
+class ExpandedBookedSessionsSerializer(serializers.ModelSerializer):
+    session = SessionInfoSerializer(read_only=True)
+
+    class Meta:
+        fields = ["id", "date", "session", "places", "amount"]
+        model = BookedSession
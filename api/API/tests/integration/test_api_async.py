@@ -0,0 +1,58 @@
+import json
+from datetime import date, time
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase, AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+from cinema import listing_cache
+from cinema.models import Hall
+
+
+class TestAsyncSessionList(TransactionTestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json",
+                "fixtures/particular_user_sessions.json"]
+
+    def setUp(self) -> None:
+        listing_cache.get_cache().clear()
+        self.async_client = AsyncClient()
+
+    def get(self, url, **extra):
+        return async_to_sync(self.async_client.get)(url, **extra)
+
+    def assertSameData(self, sync_name, async_name, args, async_args=None):
+        expected = APIClient().get(reverse(f"api:{sync_name}", args=args)).json()
+        listing_cache.get_cache().clear()
+        response = self.get(reverse(f"api:{async_name}", args=async_args or args))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected, json.loads(response.content))
+
+    def test_client_session_list(self):
+        self.assertSameData("clients-session-list", "async-clients-session-list", [date(2021, 10, 4)])
+
+    def test_client_session_list_sorted(self):
+        self.assertSameData("clients-session-list", "async-clients-session-list", [date(2021, 10, 4), "price"])
+
+    def test_today_session_list(self):
+        self.assertSameData("today-session-list", "async-today-session-list", [time(0), time(23)])
+
+    def test_today_session_list_hall(self):
+        self.assertSameData("today-session-list", "async-today-session-list", [Hall.objects.get(id=1)])
+
+    def test_today_session_list_missing_hall(self):
+        self.assertEqual(404, APIClient().get(reverse("api:today-session-list", args=[Hall(id=100)])).status_code)
+        self.assertEqual(404, self.get(reverse("api:async-today-session-list", args=[Hall(id=100)])).status_code)
+
+    def test_not_modified(self):
+        url = reverse("api:async-clients-session-list", args=[date(2021, 10, 4)])
+        response = self.get(url)
+        # The async test client takes raw header names
+        response = self.get(url, **{"If-None-Match": response["ETag"]})
+        self.assertEqual(304, response.status_code)
+
+    def test_post_not_allowed(self):
+        url = reverse("api:async-clients-session-list", args=[date(2021, 10, 4)])
+        response = async_to_sync(self.async_client.post)(url)
+        self.assertEqual(405, response.status_code)
@@ -1,4 +1,6 @@
-from datetime import date, time
+import json
+from datetime import date, time, timedelta
+from django.utils import timezone
 from django.db.models import ObjectDoesNotExist
 from rest_framework.test import APIClient
 from django.urls import reverse
@@ -6,6 +8,7 @@ from django.test import TestCase
 from customuser.models import MyUser
 from cinema.models import Session, BookedSession, Hall
 from api.API.serializers import UserInfoBookedSessionsSerializer
+from api.models import IdempotencyKey
 
 
 class TestBookedSession(TestCase):
@@ -24,6 +27,18 @@ class TestBookedSession(TestCase):
         response = self.client.get(reverse("api:create-booked-session", args=[self.session, date(2021, 10, 5)]))
         self.assertEqual(401, response.status_code)
 
+    def test_unathorized_without_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse("api:create-booked-session", args=[self.session, date(2021, 10, 5)]),
+                                        data={"places": 1})
+        self.assertEqual(401, response.status_code)
+
+    def test_not_existing_session(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse("api:create-booked-session", args=[Session(id=100), date(2021, 10, 5)]),
+                                    data={"places": 1})
+        self.assertEqual(404, response.status_code)
+
     def test_no_free_places_error_message(self):
         self.client.force_authenticate(self.user)
         response = self.client.post(reverse("api:create-booked-session", args=[self.session, date(2021, 10, 4)]),
@@ -71,6 +86,121 @@ class TestBookedSession(TestCase):
         self.assertEqual(message, response.data["fail_message"])
 
 
+class TestBookedSessionBatch(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = MyUser.objects.get(id=2)
+
+    def post_items(self, items):
+        return self.client.post(reverse("api:create-booked-sessions"), data={"items": items}, format="json")
+
+    def test_unathorized_not_allowed(self):
+        response = self.post_items([{"session": 3, "date": "2021-10-05", "places": 1}])
+        self.assertEqual(401, response.status_code)
+
+    def test_correct_creation(self):
+        self.client.force_authenticate(self.user)
+        response = self.post_items([{"session": 3, "date": "2021-10-05", "places": 1},
+                                    {"session": 3, "date": "2021-10-06", "places": 2},
+                                    {"session": 1, "date": "2021-10-05", "places": 3}])
+        self.assertEqual(201, response.status_code)
+        self.assertEqual("Sessions were booked", response.data["success_message"])
+        self.assertEqual(8, BookedSession.objects.count())
+        self.assertEqual(10000000 - 60, MyUser.objects.get(id=2).wallet)
+
+    def test_no_free_places_nothing_created(self):
+        self.client.force_authenticate(self.user)
+        response = self.post_items([{"session": 3, "date": "2021-10-05", "places": 1},
+                                    {"session": 1, "date": "2021-10-04", "places": 1}])
+        self.assertEqual(400, response.status_code)
+        self.assertTrue(response.data["results"][0]["success"])
+        self.assertEqual("Not enough free places", response.data["results"][1]["fail_message"])
+        self.assertEqual(5, BookedSession.objects.count())
+        self.assertEqual(10000000, MyUser.objects.get(id=2).wallet)
+
+    def test_places_summed_per_session_date(self):
+        self.client.force_authenticate(self.user)
+        response = self.post_items([{"session": 3, "date": "2021-10-05", "places": 2},
+                                    {"session": 3, "date": "2021-10-05", "places": 2}])
+        self.assertEqual("Not enough free places", response.data["results"][1]["fail_message"])
+
+    def test_incorrect_session(self):
+        self.client.force_authenticate(self.user)
+        response = self.post_items([{"session": 100, "date": "2021-10-05", "places": 1}])
+        self.assertEqual("Incorrect data", response.data["results"][0]["fail_message"])
+
+    def test_not_enough_money(self):
+        user = MyUser.objects.create_user(username="ppl", password="1", wallet=15)
+        self.client.force_authenticate(user)
+        response = self.post_items([{"session": 3, "date": "2021-10-05", "places": 1},
+                                    {"session": 3, "date": "2021-10-06", "places": 1}])
+        self.assertEqual("Not enough money", response.data["results"][0]["fail_message"])
+        self.assertEqual(15, MyUser.objects.get(id=user.id).wallet)
+
+
+class TestIdempotentBooking(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = MyUser.objects.get(id=2)
+        self.session = Session.objects.get(id=3)
+        self.client.force_authenticate(self.user)
+
+    def book(self, key):
+        return self.client.post(reverse("api:create-booked-session", args=[self.session, date(2021, 10, 5)]),
+                                data={"places": 1}, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeated_key_not_booked_twice(self):
+        self.book("key")
+        response = self.book("key")
+        self.assertEqual(201, response.status_code)
+        self.assertEqual("Session was booked", response.data["success_message"])
+        self.assertEqual(1, BookedSession.objects.filter(session=self.session).count())
+        self.assertEqual(10000000 - 10, MyUser.objects.get(id=2).wallet)
+
+    def test_key_reused_with_other_body(self):
+        self.book("key")
+        response = self.client.post(reverse("api:create-booked-session", args=[self.session, date(2021, 10, 5)]),
+                                    data={"places": 2}, HTTP_IDEMPOTENCY_KEY="key")
+        self.assertEqual(422, response.status_code)
+        self.assertEqual(1, BookedSession.objects.filter(session=self.session).count())
+
+    def test_key_reused_on_other_endpoint(self):
+        self.book("key")
+        response = self.client.post(reverse("api:create-booked-sessions"), HTTP_IDEMPOTENCY_KEY="key", format="json",
+                                    data={"items": [{"session": self.session.id, "date": "2021-10-06", "places": 1}]})
+        self.assertEqual(422, response.status_code)
+        self.assertEqual(1, BookedSession.objects.filter(session=self.session).count())
+
+    def test_different_keys(self):
+        self.book("key")
+        self.book("key1")
+        self.assertEqual(2, BookedSession.objects.filter(session=self.session).count())
+
+    def test_expired_key(self):
+        self.book("key")
+        IdempotencyKey.objects.update(created=timezone.now() - timedelta(days=2))
+        self.book("key")
+        self.assertEqual(2, BookedSession.objects.filter(session=self.session).count())
+
+    def test_purge_expired(self):
+        self.book("key")
+        self.book("key1")
+        IdempotencyKey.objects.filter(key=IdempotencyKey.hash_key("key")).update(
+            created=timezone.now() - timedelta(days=2))
+        self.assertEqual(1, IdempotencyKey.purge_expired())
+        self.assertEqual(1, IdempotencyKey.objects.count())
+
+
 class TestBookedSessionList(TestCase):
     fixtures = ["fixtures/users.json",
                 "fixtures/halls.json",
@@ -109,4 +239,72 @@ class TestBookedSessionList(TestCase):
         booked_sessions = UserInfoBookedSessionsSerializer(BookedSession.objects.filter(user=self.user2), many=True).data
         booked_sessions.append({"total_spent": 0})
         booked_sessions.append({"current_money": 10000000})
-        self.assertEqual(booked_sessions, response.data["results"])
\ No newline at end of file
+        self.assertEqual(booked_sessions, response.data["results"])
+
+    def test_summary(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("api:my-booked-sessions"))
+        self.assertEqual({"total_spent": 30, "current_money": 10000}, response.data["summary"])
+
+    def test_expanded_list(self):
+        self.client.force_authenticate(self.user3)
+        response = self.client.get(reverse("api:my-booked-sessions"), data={"expand": "session"})
+        booked_session = BookedSession.objects.select_related("session__hall").get(id=4)
+        self.assertEqual(2, len(response.data["results"]))
+        self.assertEqual({"id": 4, "date": "2021-10-04", "places": booked_session.places,
+                          "amount": booked_session.amount,
+                          "session": {"id": booked_session.session.id,
+                                      "start_date": booked_session.session.start_date.isoformat(),
+                                      "end_date": booked_session.session.end_date.isoformat(),
+                                      "start_time": booked_session.session.start_time.isoformat(),
+                                      "end_time": booked_session.session.end_time.isoformat(),
+                                      "price": booked_session.session.price,
+                                      "hall": {"name": booked_session.session.hall.name,
+                                               "size": booked_session.session.hall.size}}},
+                         response.data["results"][0])
+        self.assertEqual({"total_spent": 30, "current_money": 10000}, response.data["summary"])
+
+    def test_expanded_list_single_query(self):
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("api:my-booked-sessions"), data={"expand": "session"})
+        self.assertEqual(3, len(response.data["results"]))
+
+
+class TestBookedSessionExport(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.admin = MyUser.objects.get(id=1)
+        self.user = MyUser.objects.get(id=3)
+
+    def test_unathorized_not_allowed(self):
+        response = self.client.get(reverse("api:my-booked-sessions-export", args=["csv"]))
+        self.assertEqual(401, response.status_code)
+
+    def test_own_bookings_exported(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("api:my-booked-sessions-export", args=["jsonl"]))
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual("application/x-ndjson", response["Content-Type"])
+        self.assertEqual([4, 5], [row["id"] for row in rows])
+        self.assertEqual({"darkin2"}, {row["user"] for row in rows})
+
+    def test_unknown_format(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("api:my-booked-sessions-export", args=["xml"]))
+        self.assertEqual(404, response.status_code)
+
+    def test_admin_export(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse("api:booked-sessions-export", args=["csv"]))
+        self.assertEqual(BookedSession.objects.count() + 1, len(b"".join(response.streaming_content).splitlines()))
+
+    def test_admin_export_forbidden(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("api:booked-sessions-export", args=["csv"]))
+        self.assertEqual(403, response.status_code)
@@ -0,0 +1,77 @@
+from datetime import date
+from rest_framework.test import APIClient
+from django.urls import reverse
+from django.test import TestCase
+from django.utils import timezone
+from customuser.models import MyUser
+from cinema.models import Session, BookedSession, SeatHold, SessionDay
+
+
+class TestSeatHold(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = MyUser.objects.get(id=2)
+        self.session = Session.objects.get(id=3)
+        self.client.force_authenticate(self.user)
+
+    def hold(self, places=1):
+        return self.client.post(reverse("api:create-seat-hold", args=[self.session, date(2021, 10, 5)]),
+                                data={"places": places})
+
+    def test_unathorized_not_allowed(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(401, self.hold().status_code)
+
+    def test_hold_created(self):
+        response = self.hold()
+        self.assertEqual("Places were held", response.data["success_message"])
+        self.assertTrue(SeatHold.objects.get(id=response.data["id"]))
+
+    def test_no_free_places(self):
+        self.hold(3)
+        response = self.hold()
+        self.assertEqual("Not enough free places", response.data["fail_message"])
+
+    def test_hold_counted_in_list(self):
+        self.hold(2)
+        response = self.client.get(reverse("api:clients-session-list", args=[date(2021, 10, 5)]))
+        free_places = {elem["id"]: elem["free_places"] for elem in response.data["results"]}
+        self.assertEqual(1, free_places[3])
+
+    def test_confirm(self):
+        hold_id = self.hold().data["id"]
+        response = self.client.post(reverse("api:confirm-seat-hold", args=[hold_id]))
+        self.assertEqual("Session was booked", response.data["success_message"])
+        self.assertTrue(BookedSession.objects.get(session=self.session, user=self.user))
+
+    def test_confirm_expired(self):
+        hold_id = self.hold().data["id"]
+        SeatHold.objects.update(expires=timezone.now())
+        response = self.client.post(reverse("api:confirm-seat-hold", args=[hold_id]))
+        self.assertEqual("Hold expired", response.data["fail_message"])
+
+    def test_failed_confirm_releases_hold(self):
+        hold_id = self.hold(2).data["id"]
+        MyUser.objects.filter(id=self.user.id).update(wallet=0)
+        response = self.client.post(reverse("api:confirm-seat-hold", args=[hold_id]))
+        self.assertEqual(400, response.status_code)
+        self.assertEqual("Not enough money", response.data["fail_message"])
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(3, SessionDay.objects.get(session=self.session, date=date(2021, 10, 5)).free_places)
+
+    def test_release(self):
+        hold_id = self.hold().data["id"]
+        response = self.client.delete(reverse("api:seat-hold", args=[hold_id]))
+        self.assertEqual(204, response.status_code)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_foreign_hold_not_found(self):
+        hold_id = self.hold().data["id"]
+        self.client.force_authenticate(MyUser.objects.get(id=1))
+        response = self.client.post(reverse("api:confirm-seat-hold", args=[hold_id]))
+        self.assertEqual(404, response.status_code)
@@ -1,5 +1,6 @@
 from datetime import time
 from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APIClient
 from django.urls import reverse
 from cinema.models import Hall, Session
@@ -171,3 +172,55 @@ class TestSessionList(TestCase):
         self.client.force_authenticate(self.s_user)
         response = self.client.get(reverse("api:session-list"))
         self.assertQuerysetEqual(serializer.data, response.data["results"])
+
+
+class TestImportSessions(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json"]
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.s_user = MyUser.objects.get(id=1)
+        self.client.force_authenticate(self.s_user)
+
+    def import_sessions(self, sessions):
+        return self.client.post(reverse("api:session-import-sessions"), data={"sessions": sessions}, format="json")
+
+    def test_not_superuser_not_allowed(self):
+        self.client.force_authenticate(MyUser.objects.get(id=2))
+        response = self.import_sessions([create_data("9:00", "11:00", "2021-11-1", "2021-11-5", 2, 10)])
+        self.assertEqual(403, response.status_code)
+
+    def test_sessions_imported(self):
+        response = self.import_sessions([create_data("9:00", "11:00", "2021-11-1", "2021-11-5", 2, 10),
+                                         create_data("11:30", "12:00", "2021-11-1", "2021-11-5", 2, 10),
+                                         create_data("23:00", "2:00", "2021-11-1", "2021-11-5", 3, 10)])
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(3, response.data["created"])
+        self.assertEqual(6, Session.objects.count())
+        self.assertEqual(10, Session.objects.get(id=6).slots.count())
+
+    def test_all_conflicts_reported(self):
+        response = self.import_sessions([create_data("9:00", "11:00", "2021-11-1", "2021-11-5", 2, 10),
+                                         create_data("10:30", "12:00", "2021-11-5", "2021-11-8", 2, 10),
+                                         create_data("14:00", "15:00", "2021-10-27", "2021-11-1", 2, 10),
+                                         create_data("23:00", "10:45", "2021-11-8", "2021-11-9", 2, 10)])
+        self.assertEqual(400, response.status_code)
+        self.assertEqual([{"row": 2, "collides_with_row": 1},
+                          {"row": 3, "session": 1},
+                          {"row": 4, "collides_with_row": 2}], response.data["conflicts"])
+        self.assertEqual(3, Session.objects.count())
+
+    def test_incorrect_rows_reported(self):
+        response = self.import_sessions([create_data("9:00", "11:00", "2021-11-1", "2021-11-5", 2, 10),
+                                         create_data("fsfs", "11:00", "2021-11-1", "2021-11-5", 2, 10),
+                                         create_data("9:00", "11:00", "2021-11-1", "2021-11-5", 100, 10)])
+        self.assertEqual([2, 3], [error["row"] for error in response.data["errors"]])
+        self.assertEqual(3, Session.objects.count())
+
+    def test_csv_file(self):
+        file = SimpleUploadedFile("sessions.csv", b"start_date,end_date,start_time,end_time,hall,price\n"
+                                                  b"2021-11-1,2021-11-5,9:00,11:00,2,10\n")
+        response = self.client.post(reverse("api:session-import-sessions"), data={"file": file})
+        self.assertEqual(1, response.data["created"])
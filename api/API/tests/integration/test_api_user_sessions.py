@@ -142,3 +142,36 @@ class TestUserSessionsAction(TestCase):
         expected = SessionSerializer(Session.objects.filter(id=1), many=True).data
         self.assertEqual(expected, data)
 
+
+
+class TestAvailability(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+
+    def test_matrix(self):
+        response = self.client.get(reverse("api:clients-availability", args=[date(2021, 10, 2), date(2021, 10, 4)]))
+        self.assertEqual(["2021-10-02", "2021-10-03", "2021-10-04"],
+                         [str(day) for day in response.data["dates"]])
+        self.assertEqual([1, 3, 2], response.data["sessions"]["id"])
+        self.assertEqual([[None, 3, 0], [None, 3, 3], [None, 3, 0]], response.data["free_places"])
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse("api:clients-availability", args=[date(2021, 10, 1), date(2021, 10, 14)]))
+
+    def test_empty_range(self):
+        response = self.client.get(reverse("api:clients-availability", args=[date(2021, 11, 1), date(2021, 11, 3)]))
+        self.assertEqual([], response.data["free_places"])
+
+    def test_incorrect_range(self):
+        response = self.client.get(reverse("api:clients-availability", args=[date(2021, 10, 4), date(2021, 10, 3)]))
+        self.assertEqual(400, response.status_code)
+
+    def test_too_long_range(self):
+        response = self.client.get(reverse("api:clients-availability", args=[date(2021, 10, 1), date(2021, 12, 1)]))
+        self.assertEqual("Incorrect date range", response.data["fail_message"])
@@ -1,8 +1,11 @@
+from datetime import timedelta
+from django.conf import settings
 from django.test import TestCase
 from django.utils import timezone
 from django.urls import reverse
 from api.models import ExpiringToken
 from customuser.models import MyUser
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.test import APIClient
 from api.misc import ExpiringTokenAuthentication
 
@@ -40,3 +43,32 @@ class TestExpiringTokenAuth(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
         response = self.client.get(reverse("api:session-list"))
         self.assertEqual(200, response.status_code)
+
+    def set_last_action(self, seconds_ago):
+        last_action = timezone.now() - timedelta(seconds=seconds_ago)
+        ExpiringToken.objects.filter(pk=self.token.pk).update(last_action=last_action)
+        return last_action
+
+    def test_fresh_token_not_written(self):
+        last_action = self.set_last_action(10)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.assertEqual(200, self.client.get(reverse("api:session-list")).status_code)
+        self.assertEqual(last_action, ExpiringToken.objects.get(pk=self.token.pk).last_action)
+
+    def test_stale_token_refreshed(self):
+        last_action = self.set_last_action(settings.TOKEN_REFRESH_SLACK + 10)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.assertEqual(200, self.client.get(reverse("api:session-list")).status_code)
+        self.assertGreater(ExpiringToken.objects.get(pk=self.token.pk).last_action,
+                           last_action + timedelta(seconds=settings.TOKEN_REFRESH_SLACK))
+
+    def test_expired_token(self):
+        self.set_last_action(settings.TOKEN_EXPIRING_TIME + 1)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.assertEqual(401, self.client.get(reverse("api:session-list")).status_code)
+        self.assertFalse(ExpiringToken.objects.filter(pk=self.token.pk).exists())
+
+    def test_token_expired_for_days(self):
+        self.set_last_action(24 * 60 * 60 + 1)
+        with self.assertRaises(AuthenticationFailed):
+            ExpiringTokenAuthentication().authenticate_credentials(self.token.key)
@@ -39,3 +39,9 @@ class TestListSessionsPlaces(TestCase):
         data = response.data["results"]
         self.assertEqual(3, data[2]["free_places"])
 
+    def test_query_count(self):
+        for day in range(5, 15):
+            BookedSession.objects.create(user=self.user, session=self.session, date=date(2021, 10, day), places=1)
+        with self.assertNumQueries(2):
+            self.client.get(reverse("api:clients-session-list", args=[date(2021, 10, 4), "price"]))
+
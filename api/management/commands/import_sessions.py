@@ -0,0 +1,30 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from api.API.imports import parse_sessions, import_sessions
+
+
+class Command(BaseCommand):
+    help = "Import sessions from a CSV or JSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = "csv" if os.path.splitext(path)[1] == ".csv" else "json"
+        with open(path) as file:
+            try:
+                rows = parse_sessions(file.read(), format)
+            except ValueError:
+                raise CommandError("Incorrect file")
+        report = import_sessions(rows)
+        for error in report["errors"]:
+            self.stdout.write(f"Row {error['row']}: {error['errors']}")
+        for conflict in report["conflicts"]:
+            if "session" in conflict:
+                self.stdout.write(f"Row {conflict['row']} collides with session {conflict['session']}")
+            else:
+                self.stdout.write(f"Row {conflict['row']} collides with row {conflict['collides_with_row']}")
+        if report["errors"] or report["conflicts"]:
+            raise CommandError("Sessions were not imported")
+        self.stdout.write(f"Imported {report['created']} sessions")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys"
+
+    def handle(self, *args, **options):
+        deleted = IdempotencyKey.purge_expired()
+        self.stdout.write(f"Deleted {deleted} expired idempotency keys")
@@ -1,9 +1,19 @@
+from collections import OrderedDict
+from datetime import timedelta
+from functools import wraps
 from rest_framework import permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
 from django.conf import settings
+from django.db import transaction, IntegrityError
 from django.utils import timezone
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.authentication import TokenAuthentication
-from .models import ExpiringToken
+from rest_framework.response import Response
+from cinema.pagination import paginate
+from .models import ExpiringToken, IdempotencyKey
 
 class IsAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -19,8 +29,93 @@ class ExpiringTokenAuthentication(TokenAuthentication):
 
     def authenticate_credentials(self, key):
         user, token = super().authenticate_credentials(key)
-        if (timezone.now() - token.last_action).seconds > settings.TOKEN_EXPIRING_TIME:
+        now = timezone.now()
+        if (now - token.last_action).total_seconds() > settings.TOKEN_EXPIRING_TIME:
             token.delete()
             raise AuthenticationFailed("Token has expired. Please, obtain a new one.")
-        token.save()
+        # Only a stale stamp is written, so most reads don't touch the token row at all
+        refresh_before = now - timedelta(seconds=settings.TOKEN_REFRESH_SLACK)
+        if token.last_action < refresh_before:
+            ExpiringToken.objects.filter(pk=token.pk, last_action__lt=refresh_before).update(last_action=now)
+            token.last_action = now
         return user, token
+
+
+def idempotent(view_method):
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key", None)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        key = IdempotencyKey.hash_key(key)
+        fingerprint = IdempotencyKey.fingerprint_request(request)
+        with transaction.atomic():
+            IdempotencyKey.objects.filter(user=request.user, key=key,
+                                          created__lt=IdempotencyKey.expiry_date()).delete()
+            try:
+                with transaction.atomic():
+                    # Concurrent requests with the same key wait here until the first one commits
+                    stored = IdempotencyKey.objects.create(user=request.user, key=key, fingerprint=fingerprint)
+            except IntegrityError:
+                stored = IdempotencyKey.objects.get(user=request.user, key=key)
+                # A key reused for another endpoint or body must not replay an unrelated response
+                if stored.fingerprint != fingerprint:
+                    return Response(status=422,
+                                    data={"fail_message": "Idempotency key was used for a different request"})
+                return Response(status=stored.status_code, data=stored.data)
+            response = view_method(self, request, *args, **kwargs)
+            stored.status_code = response.status_code
+            stored.data = response.data
+            stored.save(update_fields=["status_code", "data"])
+        return response
+    return wrapper
+
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    offset_query_param = "offset"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        # Offset URLs are still served by the counting paginator, so old clients keep working
+        if self.offset_query_param in request.query_params:
+            self.offset_pagination = LimitOffsetPagination()
+            return self.offset_pagination.paginate_queryset(queryset.order_by(*view.keyset_ordering), request, view)
+        self.offset_pagination = None
+        try:
+            page_size = min(int(request.query_params[self.limit_query_param]), self.max_page_size)
+        except (KeyError, ValueError):
+            page_size = self.page_size
+        if page_size <= 0:
+            page_size = self.page_size
+        cursor = request.query_params.get(self.cursor_query_param)
+        try:
+            self.page = paginate(queryset, view.keyset_ordering, cursor, page_size)
+        except ValueError:
+            raise NotFound("Invalid cursor")
+        # The first page keeps the count clients read before cursors existed, deeper pages skip the COUNT(*)
+        if cursor:
+            self.count = None
+        else:
+            self.count = queryset.count() if self.page.has_next() else len(self.page)
+        return self.page.object_list
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if self.offset_pagination:
+            return self.offset_pagination.get_paginated_response(data)
+        counted = [("count", self.count)] if self.count is not None else []
+        return Response(OrderedDict(counted + [
+            ("next", self.get_link(self.page.next_cursor)),
+            ("previous", self.get_link(self.page.previous_cursor)),
+            ("results", data)
+        ]))
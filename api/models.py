@@ -1,6 +1,45 @@
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
 
 class ExpiringToken(Token):
-    last_action = models.DateTimeField(auto_now=True)
\ No newline at end of file
+    last_action = models.DateTimeField(auto_now=True)
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=64, default="")
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+
+    class Meta:
+        unique_together = ["user", "key"]
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @staticmethod
+    def fingerprint_request(request):
+        # Parsed data rather than the raw body, retries of a form post come with a new multipart boundary
+        data = dict(request.data.lists()) if hasattr(request.data, "lists") else request.data
+        body = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.sha256("\n".join([request.method, request.path, body]).encode()).hexdigest()
+
+    @classmethod
+    def expiry_date(cls):
+        return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_EXPIRING_TIME)
+
+    @classmethod
+    def purge_expired(cls):
+        # Keys have no dependent rows, so this is a single DELETE statement
+        deleted, _ = cls.objects.filter(created__lt=cls.expiry_date()).delete()
+        return deleted
@@ -1,5 +1,6 @@
 from .API.resources import HallViewSet, SessionViewSet, UserViewSet, ClientSessionView, BookedSessionViewSet, \
-    BookedSessionListViewSet
+    BookedSessionListViewSet, SeatHoldViewSet, BookedSessionExportViewSet
+from .API import async_resources
 from rest_framework import routers
 from django.urls import path
 
@@ -9,15 +10,37 @@ urlpatterns = [
     path("clients-session-list/<date:date>/<str:sort>/",
          ClientSessionView.as_view({"get": "list"}), name="clients-session-list"),
     path("clients-session-list/<date:date>/", ClientSessionView.as_view({"get": "list"}), name="clients-session-list"),
+    path("clients-availability/<date:start_date>/<date:end_date>/",
+         ClientSessionView.as_view({"get": "availability"}), name="clients-availability"),
     path("create-booked-session/<session:s>/<date:date>/", BookedSessionViewSet.as_view({"post": "create"}),
          name="create-booked-session"),
+    path("create-booked-sessions/", BookedSessionViewSet.as_view({"post": "create_many"}),
+         name="create-booked-sessions"),
+    path("create-seat-hold/<session:s>/<date:date>/", SeatHoldViewSet.as_view({"post": "create"}),
+         name="create-seat-hold"),
+    path("seat-holds/<int:pk>/", SeatHoldViewSet.as_view({"delete": "destroy"}), name="seat-hold"),
+    path("seat-holds/<int:pk>/confirm/", SeatHoldViewSet.as_view({"post": "confirm"}), name="confirm-seat-hold"),
     path("my-booked-sessions/", BookedSessionListViewSet.as_view({"get": "list"}), name="my-booked-sessions"),
+    path("my-booked-sessions/export/<str:export_format>/", BookedSessionListViewSet.as_view({"get": "export"}),
+         name="my-booked-sessions-export"),
+    path("booked-sessions/export/<str:export_format>/", BookedSessionExportViewSet.as_view({"get": "export"}),
+         name="booked-sessions-export"),
     path("today-session-list/<time:start_range>/<time:end_range>/<hall:hall>/",
          ClientSessionView.as_view({"get": "get_sessions_in_time"}), name="today-session-list"),
     path("today-session-list/<time:start_range>/<time:end_range>/",
          ClientSessionView.as_view({"get": "get_sessions_in_time"}), name="today-session-list"),
     path("today-session-list/<hall:hall>/",
-         ClientSessionView.as_view({"get": "get_sessions_in_time"}), name="today-session-list")
+         ClientSessionView.as_view({"get": "get_sessions_in_time"}), name="today-session-list"),
+    path("async/clients-session-list/<date:date>/<str:sort>/",
+         async_resources.client_session_list, name="async-clients-session-list"),
+    path("async/clients-session-list/<date:date>/",
+         async_resources.client_session_list, name="async-clients-session-list"),
+    path("async/today-session-list/<time:start_range>/<time:end_range>/<hall:hall>/",
+         async_resources.today_session_list, name="async-today-session-list"),
+    path("async/today-session-list/<time:start_range>/<time:end_range>/",
+         async_resources.today_session_list, name="async-today-session-list"),
+    path("async/today-session-list/<hall:hall>/",
+         async_resources.today_session_list, name="async-today-session-list")
 ]
 router = routers.SimpleRouter()
 router.register(r'halls', HallViewSet)
@@ -0,0 +1,96 @@
+# Run with: python manage.py test benchmarks.bench_async --pattern="bench_*.py"
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+from io import BytesIO
+from time import perf_counter
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import TransactionTestCase, override_settings
+from cinema.models import Hall, Session
+from diplom.asgi import application
+
+REQUESTS = 1000
+CONCURRENCY = 200
+SESSIONS = 50
+PATH = "/api/clients-session-list/2021-10-04/price/"
+ASYNC_PATH = "/api/async/clients-session-list/2021-10-04/price/"
+
+
+def report(name, elapsed, latencies):
+    latencies = sorted(latencies)
+    print(f"{name}: {len(latencies) / elapsed:.0f} req/s, p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+
+
+def wsgi_request(handler, path):
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "SERVER_NAME": "testserver",
+               "SERVER_PORT": "80", "HTTP_HOST": "testserver", "wsgi.input": BytesIO(), "wsgi.url_scheme": "http"}
+    statuses = []
+    body = b"".join(handler(environ, lambda status, headers: statuses.append(status)))
+    return statuses[0], body
+
+
+async def asgi_request(path):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "query_string": b"", "headers": [(b"host", b"testserver")],
+             "server": ("testserver", 80), "client": ("127.0.0.1", 0)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]["status"]
+
+
+# Every request has to reach the database, otherwise the listing cache answers both paths
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+class BenchAsync(TransactionTestCase):
+
+    def setUp(self) -> None:
+        sessions = [Session(start_time=time(minute % 24, 0), end_time=time(minute % 24, 30),
+                            start_date=date(2021, 10, 1), end_date=date(2021, 10, 10),
+                            hall=Hall.objects.create(name=f"hall{minute}", size=100), price=minute)
+                    for minute in range(SESSIONS)]
+        Session.import_many(sessions)
+
+    def test_wsgi_vs_asgi(self):
+        handler = WSGIHandler()
+        self.assertEqual("200 OK", wsgi_request(handler, PATH)[0])
+
+        # A threaded WSGI server gets as many threads as the async views get database threads,
+        # clients wait on it from as many threads as there are requests in flight
+        with ThreadPoolExecutor(max_workers=settings.ASYNC_DB_THREADS) as server:
+            def timed_wsgi(i):
+                submitted = perf_counter()
+                server.submit(wsgi_request, handler, PATH).result()
+                return perf_counter() - submitted
+
+            with ThreadPoolExecutor(max_workers=CONCURRENCY) as clients:
+                start = perf_counter()
+                latencies = list(clients.map(timed_wsgi, range(REQUESTS)))
+                wsgi_elapsed = perf_counter() - start
+
+        async def run_asgi():
+            semaphore = asyncio.Semaphore(CONCURRENCY)
+
+            async def timed_asgi():
+                async with semaphore:
+                    submitted = perf_counter()
+                    status = await asgi_request(ASYNC_PATH)
+                    return status, perf_counter() - submitted
+
+            start = perf_counter()
+            results = await asyncio.gather(*[timed_asgi() for i in range(REQUESTS)])
+            return perf_counter() - start, results
+
+        self.assertEqual(200, asyncio.run(asgi_request(ASYNC_PATH)))
+        asgi_elapsed, results = asyncio.run(run_asgi())
+        self.assertEqual({200}, {status for status, latency in results})
+        print(f"\n{REQUESTS} requests, {SESSIONS} sessions per page, {CONCURRENCY} in flight")
+        report("WSGI, sync view ", wsgi_elapsed, latencies)
+        report("ASGI, async view", asgi_elapsed, [latency for status, latency in results])
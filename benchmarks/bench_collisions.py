@@ -0,0 +1,41 @@
+# Run with: python manage.py test benchmarks.bench_collisions --pattern="bench_*.py"
+import random
+from timeit import timeit
+from django.test import TestCase
+from cinema.models import Hall, Session, SessionSlot
+from cinema.tests.collisions import q_collisions, random_session
+
+SESSIONS_PER_HALL = 10000
+PROBES = 200
+
+
+class BenchCollisions(TestCase):
+    # Sessions running 0-6 days
+    lengths = (0, 6)
+
+    @classmethod
+    def setUpTestData(cls):
+        random.seed(0)
+        cls.hall = Hall.objects.create(name="hall", size=10)
+        sessions = [random_session(cls.hall, days=3650, lengths=cls.lengths) for i in range(SESSIONS_PER_HALL)]
+        Session.objects.bulk_create(sessions, batch_size=1000)
+        slots = []
+        for session in Session.objects.all():
+            slots.extend(SessionSlot.build(session))
+        SessionSlot.objects.bulk_create(slots, batch_size=1000)
+        cls.probes = [random_session(cls.hall, days=3650, lengths=cls.lengths) for i in range(PROBES)]
+
+    def test_collisions(self):
+        for probe in self.probes:
+            self.assertEqual(q_collisions(probe).exists(), SessionSlot.collisions(probe).exists())
+        q_time = timeit(lambda: [q_collisions(probe).exists() for probe in self.probes], number=3)
+        slot_time = timeit(lambda: [SessionSlot.collisions(probe).exists() for probe in self.probes], number=3)
+        print(f"\n{SESSIONS_PER_HALL} sessions per hall running {self.lengths[0]}-{self.lengths[1]} days, "
+              f"{SessionSlot.objects.count()} slot rows, {PROBES} checks x 3")
+        print(f"Q query:    {q_time:.3f}s")
+        print(f"Slot index: {slot_time:.3f}s")
+
+
+class BenchMonthLongCollisions(BenchCollisions):
+    # Slot rows grow with the session length, the Q query reads one row per session whatever its length
+    lengths = (28, 31)
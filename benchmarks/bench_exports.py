@@ -0,0 +1,52 @@
+# Run with: python manage.py test benchmarks.bench_exports --pattern="bench_*.py"
+import tracemalloc
+from datetime import date, time, timedelta
+from time import perf_counter
+from django.test import TestCase
+from cinema.models import Hall, Session, BookedSession
+from cinema import exports
+from customuser.models import MyUser
+
+ROWS = 1000000
+BATCH = 10000
+MEMORY_CEILING = 16 * 1024 * 1024
+
+
+class BenchBookingExport(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = MyUser.objects.create_user(username="finance", password="1")
+        session = Session.objects.create(start_time=time(10), end_time=time(11), start_date=date(2021, 10, 1),
+                                         end_date=date(2022, 10, 1), hall=Hall.objects.create(name="hall", size=100),
+                                         price=10)
+        # Rows go straight to the table, the booking path would take hours for a million of them
+        for start in range(0, ROWS, BATCH):
+            BookedSession.objects.bulk_create([
+                BookedSession(user=user, session=session, date=date(2021, 10, 1) + timedelta(days=i % 365),
+                              places=1, amount=10)
+                for i in range(start, start + BATCH)
+            ])
+
+    def export(self, export_format):
+        response = exports.export_response(BookedSession.objects.all(), export_format, "bench")
+        lines = 0
+        tracemalloc.start()
+        started = perf_counter()
+        for chunk in response.streaming_content:
+            lines += chunk.count(b"\n")
+        elapsed = perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"\n{export_format}: {lines} lines in {elapsed:.1f}s, peak {peak / 1024 / 1024:.1f}MB")
+        return lines, peak
+
+    def test_csv(self):
+        lines, peak = self.export("csv")
+        self.assertEqual(ROWS + 1, lines)
+        self.assertLess(peak, MEMORY_CEILING)
+
+    def test_jsonl(self):
+        lines, peak = self.export("jsonl")
+        self.assertEqual(ROWS, lines)
+        self.assertLess(peak, MEMORY_CEILING)
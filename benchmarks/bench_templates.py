@@ -0,0 +1,43 @@
+# Run with: python manage.py test benchmarks.bench_templates --pattern="bench_*.py"
+from datetime import date, time
+from timeit import timeit
+from django.contrib.auth.models import AnonymousUser
+from django.template.loader import render_to_string
+from django.test import TestCase, RequestFactory
+from cinema.models import Hall, Session
+from cinema import listing_cache
+
+SESSIONS = 50
+RENDERS = 500
+
+
+class BenchSessionTable(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        sessions = [Session(start_time=time(10), end_time=time(11), start_date=date(2021, 10, 1),
+                            end_date=date(2021, 10, 10), hall=Hall.objects.create(name=f"hall{i}", size=100), price=i)
+                    for i in range(SESSIONS)]
+        Session.import_many(sessions)
+
+    def setUp(self) -> None:
+        listing_cache.get_cache().clear()
+        self.request = RequestFactory().get("/")
+        self.request.user = AnonymousUser()
+        self.object_list = list(Session.objects.running_on(date(2021, 10, 4)).with_free_places().
+                                select_related("hall"))
+
+    def render(self, version):
+        context = {"object_list": self.object_list, "date": date(2021, 10, 4), "sort": None, "page_obj": None,
+                   "listing_version": version, "cache_timeout": 60, "listing_cache_alias": "default"}
+        return render_to_string("user_session_list.html", context, request=self.request)
+
+    def test_render(self):
+        self.assertEqual(self.render("cold"), self.render("warm"))
+        # A fresh version every time misses the fragment, the same one hits it after the first render
+        versions = iter(range(RENDERS))
+        cold = timeit(lambda: self.render(next(versions)), number=RENDERS)
+        warm = timeit(lambda: self.render("warm"), number=RENDERS)
+        print(f"\n{SESSIONS} rows, {RENDERS} renders")
+        print(f"Table rendered: {cold / RENDERS * 1000:.2f}ms per page")
+        print(f"Table cached:   {warm / RENDERS * 1000:.2f}ms per page")
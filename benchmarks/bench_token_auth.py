@@ -0,0 +1,43 @@
+# Run with: python manage.py test benchmarks.bench_token_auth --pattern="bench_*.py"
+from datetime import date, time
+from timeit import timeit
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.models import ExpiringToken
+from cinema.models import Hall, Session
+from customuser.models import MyUser
+
+SESSIONS = 10
+REQUESTS = 1000
+
+
+class BenchTokenAuth(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = MyUser.objects.create_user(username="darkin", password="1", is_superuser=True)
+        cls.token = ExpiringToken.objects.create(user=user)
+        Session.import_many([Session(start_time=time(10), end_time=time(11), start_date=date(2021, 10, 1),
+                                     end_date=date(2021, 10, 10), hall=Hall.objects.create(name=f"hall{i}", size=100),
+                                     price=i)
+                             for i in range(SESSIONS)])
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.url = reverse("api:session-list")
+
+    def read(self):
+        response = self.client.get(self.url)
+        assert response.status_code == 200
+
+    def test_reads(self):
+        # No slack writes the stamp on every request, as before
+        with override_settings(TOKEN_REFRESH_SLACK=0):
+            every = timeit(self.read, number=REQUESTS)
+        with override_settings(TOKEN_REFRESH_SLACK=30):
+            throttled = timeit(self.read, number=REQUESTS)
+        print(f"\n{REQUESTS} authenticated reads of {SESSIONS} sessions")
+        print(f"Stamp written every request: {REQUESTS / every:.0f} req/s")
+        print(f"Stamp written after slack:   {REQUESTS / throttled:.0f} req/s")
@@ -23,4 +23,8 @@ class DateExpiredException(Exception):
 
 
 class NotEnoughMoneyException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class HoldExpiredException(Exception):
+    pass
@@ -0,0 +1,56 @@
+import csv
+from itertools import islice
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse, Http404
+
+COLUMNS = ["id", "user__username", "date", "session_id", "session__hall__name", "session__start_time",
+           "session__end_time", "places", "amount"]
+HEADER = ["id", "user", "date", "session", "hall", "start_time", "end_time", "places", "amount"]
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def booking_rows(queryset):
+    # Plain tuples fetched chunk by chunk, through a server-side cursor on backends that have one
+    return queryset.order_by("id").values_list(*COLUMNS).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADER)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(HEADER, row))) + "\n"
+
+
+def joined(lines):
+    # One write per chunk of rows instead of one per row
+    while True:
+        chunk = "".join(islice(lines, settings.EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "jsonl": (jsonl_lines, "application/x-ndjson"),
+}
+
+
+def export_response(queryset, export_format, filename):
+    if export_format not in FORMATS:
+        raise Http404("Unknown export format")
+    lines, content_type = FORMATS[export_format]
+    response = StreamingHttpResponse(joined(lines(booking_rows(queryset))), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    return response
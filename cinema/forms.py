@@ -2,7 +2,10 @@ from datetime import date, time, datetime
 from django import forms
 from django.utils import timezone
 from django.contrib.admin.widgets import AdminDateWidget, AdminTimeWidget
-from .models import Hall, Session, BookedSession
+from .models import Hall, Session, SeatHold, ALL_WEEKDAYS
+
+WEEKDAYS = [(0, "Monday"), (1, "Tuesday"), (2, "Wednesday"), (3, "Thursday"),
+            (4, "Friday"), (5, "Saturday"), (6, "Sunday")]
 
 
 class HallForm(forms.ModelForm):
@@ -16,6 +19,18 @@ class SessionForm(forms.ModelForm):
     end_time = forms.TimeField()
     start_date = forms.DateField()
     end_date = forms.DateField()
+    weekdays = forms.TypedMultipleChoiceField(choices=WEEKDAYS, coerce=int, required=False,
+                                              widget=forms.CheckboxSelectMultiple,
+                                              help_text="Leave empty to run every day")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.id:
+            self.initial["weekdays"] = [day for day, name in WEEKDAYS if self.instance.weekdays & (1 << day)]
+
+    def clean_weekdays(self):
+        weekdays = sum(1 << day for day in set(self.cleaned_data["weekdays"]))
+        return weekdays or ALL_WEEKDAYS
 
     def clean(self):
         cleaned_data = super().clean()
@@ -28,12 +43,12 @@ class SessionForm(forms.ModelForm):
             self.add_error("__all__", "Incorrect date")
 
     class Meta:
-        fields = ["start_date", "end_date", "start_time", "end_time", "hall", "price"]
+        fields = ["start_date", "end_date", "start_time", "end_time", "weekdays", "hall", "price"]
         model = Session
 
 
-class BookedSessionForm(forms.ModelForm):
+class SeatHoldForm(forms.ModelForm):
 
     class Meta:
         fields = ["places"]
-        model = BookedSession
+        model = SeatHold
@@ -0,0 +1,102 @@
+from datetime import datetime
+from hashlib import sha256
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.views.decorators.http import condition
+
+HITS_KEY = "listing:hits"
+MISSES_KEY = "listing:misses"
+
+
+def get_cache():
+    return caches[settings.LISTING_CACHE_ALIAS]
+
+
+def version_key(date):
+    return f"listing:version:{date.isoformat()}"
+
+
+def new_version():
+    return uuid4().hex
+
+
+def version(date):
+    cache = get_cache()
+    key = version_key(date)
+    current = cache.get(key)
+    if current is None:
+        current = new_version()
+        if not cache.add(key, current, timeout=None):
+            current = cache.get(key) or current
+    return current
+
+
+def etag(date, *parts):
+    return sha256(repr((version(date),) + parts).encode()).hexdigest()
+
+
+def make_key(prefix, date, *parts, current=None):
+    # The version is read before the listing is queried, so a page built from data
+    # that changed meanwhile is stored under a version nobody asks for anymore
+    parts = sha256(repr(parts).encode()).hexdigest()
+    return f"listing:{prefix}:{date.isoformat()}:{current or version(date)}:{parts}"
+
+
+def count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def fetch(key):
+    value = get_cache().get(key)
+    count(MISSES_KEY if value is None else HITS_KEY)
+    return value
+
+
+def store(key, value):
+    get_cache().set(key, value, timeout=settings.LISTING_CACHE_TIMEOUT)
+
+
+def bump(dates):
+    get_cache().set_many({version_key(date): new_version() for date in dates}, timeout=None)
+
+
+def invalidate(dates):
+    dates = frozenset(dates)
+    if not dates:
+        return
+    # Bumping again on commit drops whatever was cached from the old rows while the transaction was open
+    bump(dates)
+    transaction.on_commit(lambda: bump(dates))
+
+
+def stats():
+    values = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    return {"hits": values.get(HITS_KEY, 0), "misses": values.get(MISSES_KEY, 0)}
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def listing_etag(date):
+    # Listing pages link to today's and tomorrow's lists, so the current date is part of the tag
+    return etag(date, datetime.now().date().isoformat())
+
+
+def conditional(get_date, anonymous_only=False):
+    # Answers 304 from the date stamp alone, before the listing is queried or serialized. There is no
+    # Last-Modified: its one-second resolution can't tell apart changes within a second
+    def skip(request):
+        return anonymous_only and request.user.is_authenticated
+
+    def etag_func(request, *args, **kwargs):
+        return None if skip(request) else listing_etag(get_date(kwargs))
+
+    return condition(etag_func=etag_func)
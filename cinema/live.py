@@ -0,0 +1,146 @@
+import asyncio
+import json
+import re
+from collections import defaultdict
+from datetime import date as date_type
+from threading import Lock
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+PATH = re.compile(r"^/live/seats/(?P<date>[0-9]{4}-[0-9]{2}-[0-9]{2})/(?:(?P<session>[0-9]+)/)?$")
+
+
+def date_channel(date):
+    return f"seats:{date.isoformat()}"
+
+
+def session_channel(session_id, date):
+    return f"seats:{date.isoformat()}:{session_id}"
+
+
+class LocalTransport:
+    # Fans messages out to listeners of this process, a shared transport only has to provide the same three methods
+    def __init__(self):
+        self.callbacks = defaultdict(set)
+        self.lock = Lock()
+
+    def publish(self, channel, message):
+        with self.lock:
+            callbacks = list(self.callbacks.get(channel, ()))
+        for callback in callbacks:
+            callback(message)
+
+    def subscribe(self, channel, callback):
+        with self.lock:
+            self.callbacks[channel].add(callback)
+
+    def unsubscribe(self, channel, callback):
+        with self.lock:
+            self.callbacks[channel].discard(callback)
+            if not self.callbacks[channel]:
+                del self.callbacks[channel]
+
+
+class Listener:
+    def __init__(self, transport, channel):
+        self.transport = transport
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def callback(self, message):
+        # Bookings are published from worker threads, the queue belongs to the event loop
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    def __enter__(self):
+        self.transport.subscribe(self.channel, self.callback)
+        return self.queue
+
+    def __exit__(self, *args):
+        self.transport.unsubscribe(self.channel, self.callback)
+
+
+class Broker:
+    def __init__(self, transport):
+        self.transport = transport
+
+    def publish(self, session_id, date, delta, free_places):
+        message = json.dumps({"session": session_id, "date": date, "delta": delta, "free_places": free_places},
+                             cls=DjangoJSONEncoder)
+        self.transport.publish(date_channel(date), message)
+        self.transport.publish(session_channel(session_id, date), message)
+
+    def listen(self, channel):
+        return Listener(self.transport, channel)
+
+
+broker = Broker(import_string(settings.LIVE_SEATS_TRANSPORT)())
+
+
+def publish_delta(session_id, date, delta, free_places):
+    transaction.on_commit(lambda: broker.publish(session_id, date, delta, free_places))
+
+
+def event(name, data):
+    return f"event: {name}\ndata: {data}\n\n".encode()
+
+
+def snapshot(date, session_id=None):
+    from .models import Session, SessionDay
+    days = SessionDay.objects.filter(date=date, session__in=Session.objects.running_on(date).values("id"))
+    if session_id is not None:
+        days = days.filter(session=session_id)
+    free_places = {str(session): places for session, places in days.values_list("session", "free_places")}
+    return json.dumps({"date": date, "free_places": free_places}, cls=DjangoJSONEncoder)
+
+
+async def stream(scope, receive, send, date, session_id=None):
+    channel = date_channel(date) if session_id is None else session_channel(session_id, date)
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")]})
+    with broker.listen(channel) as queue:
+        # Listening starts before the snapshot is read so no commit is missed, deltas carry the resulting free places
+        data = await sync_to_async(snapshot)(date, session_id)
+        await send({"type": "http.response.body", "body": event("snapshot", data), "more_body": True})
+        disconnect = asyncio.ensure_future(receive())
+        try:
+            while True:
+                message = asyncio.ensure_future(queue.get())
+                done, pending = await asyncio.wait([message, disconnect], timeout=settings.LIVE_SEATS_KEEPALIVE,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if disconnect in done:
+                    if disconnect.result()["type"] == "http.disconnect":
+                        message.cancel()
+                        return
+                    disconnect = asyncio.ensure_future(receive())
+                if message in done:
+                    body = event("delta", message.result())
+                else:
+                    message.cancel()
+                    if done:
+                        continue
+                    body = b": keepalive\n\n"
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        finally:
+            disconnect.cancel()
+
+
+def router(application):
+    async def app(scope, receive, send):
+        match = PATH.match(scope["path"]) if scope["type"] == "http" else None
+        if match is None:
+            return await application(scope, receive, send)
+        if scope["method"] != "GET":
+            await send({"type": "http.response.start", "status": 405, "headers": [(b"allow", b"GET")]})
+            return await send({"type": "http.response.body", "body": b""})
+        try:
+            date = date_type.fromisoformat(match["date"])
+        except ValueError:
+            await send({"type": "http.response.start", "status": 404, "headers": []})
+            return await send({"type": "http.response.body", "body": b""})
+        session_id = int(match["session"]) if match["session"] else None
+        await stream(scope, receive, send, date, session_id)
+    return app
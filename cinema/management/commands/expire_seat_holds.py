@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from cinema.models import SeatHold
+
+
+class Command(BaseCommand):
+    help = "Release places of expired seat holds"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--interval", type=int, default=0,
+                            help="Keep running and sweep every INTERVAL seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = SeatHold.expire(options["batch_size"])
+            self.stdout.write(f"Released {expired} expired seat holds")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
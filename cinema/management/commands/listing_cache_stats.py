@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from cinema import listing_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit and miss counters of the session listing cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true")
+
+    def handle(self, *args, **options):
+        stats = listing_cache.stats()
+        self.stdout.write(f"Listing cache: {stats['hits']} hits, {stats['misses']} misses")
+        if options["reset"]:
+            listing_cache.reset_stats()
@@ -0,0 +1,30 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from cinema.models import Session, SessionDay
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per day availability of sessions from booked sessions and seat holds"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start-date", type=date.fromisoformat, default=None)
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        start_date = options["start_date"]
+        sessions = Session.objects.select_related("hall").order_by("id")
+        if start_date:
+            sessions = sessions.filter(end_date__gte=start_date)
+        counts = {"created": 0, "updated": 0, "deleted": 0}
+        last_id = 0
+        while True:
+            chunk = list(sessions.filter(id__gt=last_id)[:options["chunk_size"]])
+            if not chunk:
+                break
+            with transaction.atomic():
+                for key, value in SessionDay.rebuild(chunk, start_date).items():
+                    counts[key] += value
+            last_id = chunk[-1].id
+        self.stdout.write(f"Session days rebuilt: {counts['created']} created, {counts['updated']} updated, "
+                          f"{counts['deleted']} deleted")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from cinema.models import BookedSession
+
+
+class Command(BaseCommand):
+    help = "Recompute has_bookings of every session and hall from booked sessions"
+
+    def handle(self, *args, **options):
+        BookedSession.reconcile_flags()
+        self.stdout.write("Booking flags reconciled")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from cinema.models import BookedSession
+
+
+class Command(BaseCommand):
+    help = "Recompute total_spent of every user from the amounts of booked sessions"
+
+    def handle(self, *args, **options):
+        BookedSession.reconcile_spending()
+        self.stdout.write("Spending totals reconciled")
@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-18 07:40
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_session_days(apps, schema_editor):
+    BookedSession = apps.get_model("cinema", "BookedSession")
+    SessionDay = apps.get_model("cinema", "SessionDay")
+    booked = BookedSession.objects.values("session", "date", "session__hall__size").annotate(places=models.Sum("places"))
+    SessionDay.objects.bulk_create([
+        SessionDay(session_id=elem["session"], date=elem["date"],
+                   free_places=max(elem["session__hall__size"] - elem["places"], 0))
+        for elem in booked
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0006_remove_session_books_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('free_places', models.IntegerField(validators=[django.core.validators.MinValueValidator(0)])),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='cinema.session')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sessionday',
+            constraint=models.CheckConstraint(check=models.Q(free_places__gte=0), name='session_day_free_places_gte_0'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='sessionday',
+            unique_together={('session', 'date')},
+        ),
+        migrations.RunPython(fill_session_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2 on 2026-10-18 07:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import time, timedelta
+
+
+def fill_session_slots(apps, schema_editor):
+    Session = apps.get_model("cinema", "Session")
+    SessionSlot = apps.get_model("cinema", "SessionSlot")
+    for session in Session.objects.iterator():
+        if session.start_time > session.end_time:
+            intervals = [(session.start_time, time.max), (time.min, session.end_time)]
+        else:
+            intervals = [(session.start_time, session.end_time)]
+        slots = []
+        day = session.start_date
+        while day <= session.end_date:
+            for start_time, end_time in intervals:
+                slots.append(SessionSlot(session_id=session.id, hall_id=session.hall_id, date=day,
+                                         start_time=start_time, end_time=end_time))
+            day += timedelta(days=1)
+        SessionSlot.objects.bulk_create(slots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0008_seat_hold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cinema.hall')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='cinema.session')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='sessionslot',
+            index=models.Index(fields=['hall', 'date', 'start_time'], name='cinema_sess_hall_id_169ba5_idx'),
+        ),
+        migrations.RunPython(fill_session_slots, migrations.RunPython.noop),
+    ]
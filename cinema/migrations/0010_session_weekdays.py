@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-18 07:54
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0009_session_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='weekdays',
+            field=models.PositiveSmallIntegerField(default=127, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(127)]),
+        ),
+    ]
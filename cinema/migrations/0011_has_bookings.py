@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+def fill_has_bookings(apps, schema_editor):
+    Hall = apps.get_model("cinema", "Hall")
+    Session = apps.get_model("cinema", "Session")
+    BookedSession = apps.get_model("cinema", "BookedSession")
+    Session.objects.update(has_bookings=models.Exists(BookedSession.objects.filter(session=models.OuterRef("pk"))))
+    Hall.objects.update(has_bookings=models.Exists(BookedSession.objects.filter(session__hall=models.OuterRef("pk"))))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0010_session_weekdays'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hall',
+            name='has_bookings',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='has_bookings',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(fill_has_bookings, migrations.RunPython.noop),
+    ]
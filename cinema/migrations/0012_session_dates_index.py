@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0011_has_bookings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['start_date', 'end_date'], name='cinema_sess_start_d_950540_idx'),
+        ),
+    ]
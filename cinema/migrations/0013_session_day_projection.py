@@ -0,0 +1,61 @@
+# Generated by Django 3.2 on 2026-10-18 08:20
+
+from datetime import timedelta
+import django.core.validators
+from django.db import migrations, models
+
+
+def project_session_days(apps, schema_editor):
+    Session = apps.get_model("cinema", "Session")
+    BookedSession = apps.get_model("cinema", "BookedSession")
+    SeatHold = apps.get_model("cinema", "SeatHold")
+    SessionDay = apps.get_model("cinema", "SessionDay")
+    booked, held = [{(elem["session"], elem["date"]): elem["places"]
+                     for elem in model.objects.values("session", "date").annotate(places=models.Sum("places"))}
+                    for model in (BookedSession, SeatHold)]
+    existing = {(day.session_id, day.date): day for day in SessionDay.objects.all()}
+    created, updated = [], []
+    for session in Session.objects.select_related("hall").iterator():
+        day = session.start_date
+        while day <= session.end_date:
+            key = (session.id, day)
+            if session.weekdays & (1 << day.weekday()) or key in existing:
+                capacity = session.hall.size
+                places = booked.get(key, 0)
+                free_places = max(capacity - places - held.get(key, 0), 0)
+                if key in existing:
+                    row = existing[key]
+                    row.capacity, row.booked, row.free_places = capacity, places, free_places
+                    updated.append(row)
+                else:
+                    created.append(SessionDay(session_id=session.id, date=day, capacity=capacity, booked=places,
+                                              free_places=free_places))
+            day += timedelta(days=1)
+    SessionDay.objects.bulk_create(created, batch_size=1000)
+    SessionDay.objects.bulk_update(updated, ["capacity", "booked", "free_places"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0012_session_dates_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionday',
+            name='capacity',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='sessionday',
+            name='booked',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddIndex(
+            model_name='sessionday',
+            index=models.Index(fields=['date'], name='cinema_sess_date_326959_idx'),
+        ),
+        migrations.RunPython(project_session_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0013_session_day_projection'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookedsession',
+            index=models.Index(fields=['user', 'date', 'id'], name='cinema_book_user_id_57a250_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['start_date', 'start_time', 'id'], name='cinema_sess_start_d_f2cc61_idx'),
+        ),
+    ]
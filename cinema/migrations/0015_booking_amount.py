@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-18 09:12
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_amounts(apps, schema_editor):
+    Session = apps.get_model("cinema", "Session")
+    BookedSession = apps.get_model("cinema", "BookedSession")
+    MyUser = apps.get_model("customuser", "MyUser")
+    # Existing bookings are charged at today's prices, the only ones known
+    price = Session.objects.filter(pk=OuterRef("session")).values("price")[:1]
+    BookedSession.objects.update(amount=Subquery(price) * F("places"))
+    spent = BookedSession.objects.filter(user=OuterRef("pk")).order_by().values("user") \
+        .annotate(total=Sum("amount")).values("total")
+    MyUser.objects.update(total_spent=Coalesce(Subquery(spent), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0014_keyset_indexes'),
+        ('customuser', '0003_total_spent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookedsession',
+            name='amount',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.RunPython(fill_amounts, migrations.RunPython.noop),
+    ]
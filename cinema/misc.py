@@ -1,8 +1,9 @@
 from django.contrib.auth.mixins import AccessMixin
 from datetime import datetime, date, time
-from django.db.models import ObjectDoesNotExist
+from django.conf import settings
 from customuser.models import MyUser
 from cinema.models import Session, Hall
+from cinema.references import ModelReference
 
 
 class SuperUserRequired(AccessMixin):
@@ -29,10 +30,7 @@ class SessionConverter:
     regex = r'[0-9]+'
 
     def to_python(self, value: str) -> Session:
-        try:
-            return Session.objects.get(id=value)
-        except ObjectDoesNotExist:
-            raise ValueError('Session does not exists')
+        return ModelReference(Session, int(value))
 
     def to_url(self, value: Session) -> str:
         return str(value.id)
@@ -53,10 +51,7 @@ class HallConverter:
     regex = r'[0-9]+'
 
     def to_python(self, value: str) -> Hall:
-        try:
-            return Hall.objects.get(id=value)
-        except ObjectDoesNotExist:
-            raise ValueError('Hall does not exists')
+        return ModelReference(Hall, int(value), settings.HALL_CACHE_TIMEOUT)
 
     def to_url(self, value: Hall) -> str:
         return str(value.id)
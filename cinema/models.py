@@ -1,14 +1,28 @@
-from django.db import models
+from collections import defaultdict
+from datetime import timedelta, time
+from django.conf import settings
+from django.db import models, transaction, connection
 from django.utils import timezone
-from django.db.models import Q, F, Sum
-from django.core.validators import MinValueValidator
-from . import exceptions
-from customuser.models import MyUser
+from django.db.models import Q, F, Exists, OuterRef, Subquery, Sum, FilteredRelation
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.core.validators import MinValueValidator, MaxValueValidator
+from . import exceptions, listing_cache, live
+from customuser.models import MyUser, WalletEntry
+
+# Bit i of Session.weekdays is set when the session runs on weekday i, Monday being 0
+ALL_WEEKDAYS = 0b1111111
+
+
+def unflagged_fields(instance):
+    # has_bookings is only written by the booking path, so saving a stale instance must not overwrite it
+    return [field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name != "has_bookings"]
 
 
 class Hall(models.Model):
     name = models.CharField(max_length=150, unique=True)
     size = models.IntegerField(validators=[MinValueValidator(0)])
+    has_bookings = models.BooleanField(default=False)
 
     def __str__(self):
         return self.name
@@ -16,9 +30,31 @@ class Hall(models.Model):
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
         if self.id:
-            if BookedSession.objects.filter(session__hall=self).exists():
+            if Hall.objects.filter(pk=self.id, has_bookings=True).exists():
                 raise exceptions.BookedSessionExistsException
-        super().save(force_insert=False, force_update=False, using=None, update_fields=None)
+        with transaction.atomic():
+            adding = self._state.adding
+            resized = not adding and not Hall.objects.filter(pk=self.id, size=self.size).exists()
+            super().save(force_insert=False, force_update=False, using=None,
+                         update_fields=None if adding else unflagged_fields(self))
+            if resized:
+                SessionDay.rebuild(self.sessions.all())
+            elif not adding:
+                # Listings show the hall name, so its running dates are stale after any change
+                listing_cache.invalidate(SessionDay.objects.filter(session__hall=self).
+                                         values_list("date", flat=True).distinct())
+
+
+class SessionQuerySet(models.QuerySet):
+    def running_on(self, date):
+        # Every running day of a session has a SessionDay row, so this is a range scan on its date index.
+        # Rows kept for the bookings and holds of a day the session stopped running on are left out.
+        return self.annotate(day=FilteredRelation("days", condition=Q(days__date=date))) \
+            .alias(weekday=F("weekdays").bitand(1 << date.weekday())) \
+            .filter(day__isnull=False, start_date__lte=date, end_date__gte=date, weekday__gt=0)
+
+    def with_free_places(self):
+        return self.annotate(free_places=F("day__free_places"))
 
 
 class Session(models.Model):
@@ -26,45 +62,168 @@ class Session(models.Model):
     end_time = models.TimeField()
     start_date = models.DateField()
     end_date = models.DateField()
+    weekdays = models.PositiveSmallIntegerField(default=ALL_WEEKDAYS,
+                                                validators=[MinValueValidator(1), MaxValueValidator(ALL_WEEKDAYS)])
     hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name="sessions")
     price = models.IntegerField(validators=[MinValueValidator(0)])
+    has_bookings = models.BooleanField(default=False)
+
+    objects = SessionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["start_date", "end_date"]),
+                   models.Index(fields=["start_date", "start_time", "id"])]
 
     def __str__(self):
         return f"Session. Time: {self.start_time} - {self.end_time}. Date: {self.start_date} - {self.end_date}"
 
+    def runs_on(self, date):
+        return self.start_date <= date <= self.end_date and bool(self.weekdays & (1 << date.weekday()))
+
+    def running_days(self, start_date=None):
+        day = max(self.start_date, start_date) if start_date else self.start_date
+        while day <= self.end_date:
+            if self.weekdays & (1 << day.weekday()):
+                yield day
+            day += timedelta(days=1)
+
+    def shares_day(self, other):
+        start_date = max(self.start_date, other.start_date)
+        end_date = min(self.end_date, other.end_date)
+        weekdays = self.weekdays & other.weekdays
+        if start_date > end_date or not weekdays:
+            return False
+        if (end_date - start_date).days >= 6:
+            return True
+        day = start_date
+        while day <= end_date:
+            if weekdays & (1 << day.weekday()):
+                return True
+            day += timedelta(days=1)
+        return False
+
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
         if self.id:
-            if BookedSession.objects.filter(session=self).exists():
+            if Session.objects.filter(pk=self.id, has_bookings=True).exists():
                 raise exceptions.BookedSessionExistsException
 
-        # Filter sessions with start date earlier or equal than end date of particular instance
-        q1 = Q(start_date__lte=self.end_date)
-
-        # Filter sessions with end date later or equal than start date of particular instance
-        q2 = Q(end_date__gte=self.start_date)
-
-        # Filter sessions with particular instance's hall
-        q3 = Q(hall=self.hall)
-        sessions = Session.objects.filter(q1 & q2 & q3)
-        if self.start_time > self.end_time:
-            condition = (
-                    Q(start_time__gt=F('end_time')) |
-                    Q(start_time__lte=self.end_time) |
-                    Q(end_time__gte=self.start_time)
-            )
-        else:
-            condition = (
-                    Q(start_time__gt=F('end_time'), start_time__lte=self.end_time) |
-                    Q(start_time__gt=F('end_time'), end_time__gte=self.start_time) |
-                    Q(start_time__lte=self.end_time, end_time__gte=self.start_time)
-            )
-        sessions = sessions.filter(condition)
-        if self.id:
-            sessions = sessions.exclude(id=self.id)
-        if sessions:
-            raise exceptions.SessionsCollideException
-        super().save(force_insert=False, force_update=False, using=None, update_fields=None)
+        with transaction.atomic():
+            if SessionSlot.collisions(self).exists():
+                raise exceptions.SessionsCollideException
+            super().save(force_insert=False, force_update=False, using=None,
+                         update_fields=None if self._state.adding else unflagged_fields(self))
+            SessionSlot.index(self)
+            SessionDay.rebuild([self])
+
+    @classmethod
+    def find_conflicts(cls, sessions):
+        if not sessions:
+            return []
+        existing = cls.objects.filter(hall__in={session.hall_id for session in sessions},
+                                      start_date__lte=max(session.end_date for session in sessions),
+                                      end_date__gte=min(session.start_date for session in sessions))
+        halls = defaultdict(list)
+        for index, session in enumerate(sessions):
+            halls[session.hall_id].append((index, session))
+        for session in existing:
+            halls[session.hall_id].append((None, session))
+
+        # Sort and sweep by date: only sessions still running on the current start date can collide
+        conflicts = []
+        for items in halls.values():
+            items.sort(key=lambda item: (item[1].start_date, item[0] is not None))
+            active = []
+            for index, session in items:
+                active = [item for item in active if item[1].end_date >= session.start_date]
+                for other_index, other in active:
+                    if index is None and other_index is None:
+                        continue
+                    if SessionSlot.times_collide(session, other) and session.shares_day(other):
+                        conflicts.append((index, other_index, other) if index is not None
+                                         else (other_index, None, session))
+                active.append((index, session))
+        conflicts.sort(key=lambda conflict: conflict[0])
+        return conflicts
+
+    @classmethod
+    def import_many(cls, sessions):
+        with transaction.atomic():
+            conflicts = cls.find_conflicts(sessions)
+            if conflicts:
+                return conflicts
+            if connection.features.can_return_rows_from_bulk_insert:
+                cls.objects.bulk_create(sessions, batch_size=1000)
+            else:
+                # Slots need primary keys, which this backend doesn't return from bulk inserts
+                for session in sessions:
+                    super(Session, session).save()
+            slots = []
+            for session in sessions:
+                slots.extend(SessionSlot.build(session))
+            SessionSlot.objects.bulk_create(slots, batch_size=1000)
+            SessionDay.rebuild(sessions)
+        return []
+
+
+class SessionSlot(models.Model):
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="slots")
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["hall", "date", "start_time"])]
+
+    @staticmethod
+    def intervals(start_time, end_time):
+        # Sessions crossing midnight are split in two, so every slot is a plain closed interval
+        if start_time > end_time:
+            return [(start_time, time.max), (time.min, end_time)]
+        return [(start_time, end_time)]
+
+    @classmethod
+    def times_collide(cls, session, other):
+        for start_time, end_time in cls.intervals(session.start_time, session.end_time):
+            for other_start_time, other_end_time in cls.intervals(other.start_time, other.end_time):
+                if start_time <= other_end_time and end_time >= other_start_time:
+                    return True
+        return False
+
+    @classmethod
+    def build(cls, session):
+        # One row per running day and interval turns the date range overlap into an equality range scan on the index
+        intervals = cls.intervals(session.start_time, session.end_time)
+        return [cls(session=session, hall_id=session.hall_id, date=day, start_time=start_time, end_time=end_time)
+                for day in session.running_days() for start_time, end_time in intervals]
+
+    @classmethod
+    def index(cls, session):
+        cls.objects.filter(session=session).delete()
+        cls.objects.bulk_create(cls.build(session))
+
+    @classmethod
+    def collisions(cls, session):
+        condition = Q()
+        for start_time, end_time in cls.intervals(session.start_time, session.end_time):
+            condition |= Q(start_time__lte=end_time, end_time__gte=start_time)
+        slots = cls.objects.filter(condition, hall=session.hall_id,
+                                   date__gte=session.start_date, date__lte=session.end_date)
+        if session.weekdays != ALL_WEEKDAYS:
+            # week_day lookups count from Sunday = 1
+            slots = slots.filter(date__week_day__in=[(day + 1) % 7 + 1 for day in range(7)
+                                                     if session.weekdays & (1 << day)])
+        if session.id:
+            slots = slots.exclude(session=session.id)
+        return slots
+
+
+def check_session_date(session, date):
+    if date < timezone.now().date():
+        raise exceptions.DateExpiredException
+    if not session.runs_on(date):
+        raise exceptions.IncorrectDataException
 
 
 class BookedSession(models.Model):
@@ -72,25 +231,300 @@ class BookedSession(models.Model):
     user = models.ForeignKey(MyUser, on_delete=models.CASCADE, related_name="users")
     date = models.DateField()
     places = models.IntegerField(validators=[MinValueValidator(1)])
+    amount = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "date", "id"])]
+
+    def check_date(self):
+        if self.session_id is None:
+            raise exceptions.IncorrectDataException
+        check_session_date(self.session, self.date)
 
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
-        if self.date < timezone.now().date():
-            raise exceptions.DateExpiredException
-        if self.date < self.session.start_date or self.date > self.session.end_date:
-            raise exceptions.IncorrectDataException
+        self.check_date()
 
-        booked_sessions = BookedSession.objects.filter(session=self.session, date=self.date).aggregate(Sum("places"))
-        places = booked_sessions["places__sum"]
-        if not places:
-            places = self.places
-        else:
-            places += self.places
-        if places > self.session.hall.size:
+        # The amount charged is kept with the booking, later price changes don't rewrite the history
+        self.amount = self.session.price * self.places
+        with transaction.atomic():
+            SessionDay.claim(self.session, self.date, self.places)
+            if not self.user.debit(self.amount):
+                raise exceptions.NotEnoughMoneyException
+            super().save(force_insert=False, force_update=False, using=None, update_fields=None)
+            WalletEntry.objects.create(user=self.user, amount=-self.amount, booked_session=self)
+            BookedSession.flag_booked([self.session])
+
+    @classmethod
+    def check_many(cls, user, booked_sessions):
+        errors = []
+        requested = defaultdict(int)
+        for booked_session in booked_sessions:
+            try:
+                booked_session.check_date()
+            except (exceptions.DateExpiredException, exceptions.IncorrectDataException) as e:
+                errors.append(e)
+            else:
+                errors.append(None)
+                requested[(booked_session.session, booked_session.date)] += booked_session.places
+
+        free_places = SessionDay.get_free_places_many(requested.keys())
+        total_price = 0
+        for i, booked_session in enumerate(booked_sessions):
+            if errors[i]:
+                continue
+            key = (booked_session.session, booked_session.date)
+            if requested[key] > free_places[key]:
+                errors[i] = exceptions.NoFreePlacesException()
+            else:
+                total_price += booked_session.session.price * booked_session.places
+        if total_price > user.wallet:
+            errors = [e or exceptions.NotEnoughMoneyException() for e in errors]
+        return errors
+
+    @classmethod
+    def book_many(cls, user, booked_sessions):
+        requested = defaultdict(int)
+        total_price = 0
+        for booked_session in booked_sessions:
+            booked_session.user = user
+            booked_session.amount = booked_session.session.price * booked_session.places
+            requested[(booked_session.session, booked_session.date)] += booked_session.places
+            total_price += booked_session.amount
+
+        with transaction.atomic():
+            # Rows are claimed in a fixed order so that concurrent batches don't deadlock
+            for (session, date), places in sorted(requested.items(), key=lambda item: (item[0][0].id, item[0][1])):
+                SessionDay.claim(session, date, places)
+            if not user.debit(total_price):
+                raise exceptions.NotEnoughMoneyException
+            if connection.features.can_return_rows_from_bulk_insert:
+                cls.objects.bulk_create(booked_sessions)
+            else:
+                # Ledger entries need primary keys, which this backend doesn't return from bulk inserts
+                for booked_session in booked_sessions:
+                    super(BookedSession, booked_session).save()
+            WalletEntry.objects.bulk_create([
+                WalletEntry(user=user, amount=-booked_session.amount, booked_session=booked_session)
+                for booked_session in booked_sessions
+            ])
+            cls.flag_booked([session for session, date in requested])
+            return booked_sessions
+
+    @staticmethod
+    def flag_booked(sessions):
+        # Only the first booking writes, later ones match no rows
+        Session.objects.filter(id__in={session.id for session in sessions}, has_bookings=False) \
+            .update(has_bookings=True)
+        Hall.objects.filter(id__in={session.hall_id for session in sessions}, has_bookings=False) \
+            .update(has_bookings=True)
+
+    @staticmethod
+    def reconcile_spending(user_ids=None):
+        users = MyUser.objects.all()
+        if user_ids is not None:
+            users = users.filter(id__in=user_ids)
+        spent = BookedSession.objects.filter(user=OuterRef("pk")).order_by().values("user"). \
+            annotate(total=Sum("amount")).values("total")
+        users.update(total_spent=Coalesce(Subquery(spent), 0))
+
+    @staticmethod
+    def reconcile_flags(session_ids=None):
+        sessions = Session.objects.all()
+        halls = Hall.objects.all()
+        if session_ids is not None:
+            sessions = sessions.filter(id__in=session_ids)
+            halls = halls.filter(id__in=sessions.values("hall"))
+        sessions.update(has_bookings=Exists(BookedSession.objects.filter(session=OuterRef("pk"))))
+        halls.update(has_bookings=Exists(BookedSession.objects.filter(session__hall=OuterRef("pk"))))
+
+
+class SessionDay(models.Model):
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="days")
+    date = models.DateField()
+    capacity = models.IntegerField(validators=[MinValueValidator(0)])
+    booked = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    free_places = models.IntegerField(validators=[MinValueValidator(0)])
+
+    class Meta:
+        unique_together = ["session", "date"]
+        indexes = [models.Index(fields=["date"])]
+        constraints = [
+            models.CheckConstraint(check=Q(free_places__gte=0), name="session_day_free_places_gte_0")
+        ]
+
+    @classmethod
+    def get_free_places(cls, session, date):
+        free_places = cls.objects.filter(session=session, date=date).values_list("free_places", flat=True).first()
+        if free_places is None:
+            return session.hall.size
+        return free_places
+
+    @classmethod
+    def availability(cls, start_date, end_date):
+        # One range scan over the date index, sessions are rows and dates are columns of the matrix
+        days = cls.objects.filter(date__gte=start_date, date__lte=end_date). \
+            order_by("session__start_time", "session", "date"). \
+            values_list("session", "date", "free_places", "session__start_time", "session__end_time",
+                        "session__hall", "session__price")
+        sessions = {"id": [], "start_time": [], "end_time": [], "hall": [], "price": []}
+        free_places = []
+        width = (end_date - start_date).days + 1
+        for session_id, date, places, start_time, end_time, hall_id, price in days:
+            if not sessions["id"] or sessions["id"][-1] != session_id:
+                for column, value in zip(sessions, (session_id, start_time, end_time, hall_id, price)):
+                    sessions[column].append(value)
+                free_places.append([None] * width)
+            free_places[-1][(date - start_date).days] = places
+        return {"dates": [start_date + timedelta(days=day) for day in range(width)],
+                "sessions": sessions,
+                "free_places": free_places}
+
+    @classmethod
+    def get_free_places_many(cls, pairs):
+        pairs = list(pairs)
+        free_places = {(session, date): session.hall.size for session, date in pairs}
+        if not pairs:
+            return free_places
+        sessions = {session.id: session for session, date in pairs}
+        days = cls.objects.filter(session__in=sessions.keys(), date__in={date for session, date in pairs})
+        for session_id, date, places in days.values_list("session", "date", "free_places"):
+            key = (sessions[session_id], date)
+            if key in free_places:
+                free_places[key] = places
+        return free_places
+
+    @classmethod
+    def claim(cls, session, date, places, book=True):
+        day, created = cls.objects.get_or_create(session=session, date=date,
+                                                 defaults={"capacity": session.hall.size,
+                                                           "free_places": session.hall.size})
+        # Seats are taken with a single conditional update, so concurrent buyers can't oversell the session
+        changes = {"free_places": F("free_places") - places}
+        if book:
+            changes["booked"] = F("booked") + places
+        updated = cls.objects.filter(pk=day.pk, free_places__gte=places).update(**changes)
+        if not updated:
             raise exceptions.NoFreePlacesException
-        if self.user.wallet < self.session.price * places:
-            raise exceptions.NotEnoughMoneyException
-        self.user.wallet -= self.session.price * self.places
-        self.user.save()
-        super().save(force_insert=False, force_update=False, using=None, update_fields=None)
+        listing_cache.invalidate([date])
+        cls.publish(session.id, date, -places)
+
+    @classmethod
+    def release(cls, session_id, date, places, book=True):
+        # A hall shrunk while places were taken never gets back more seats than it now has, as in rebuild
+        unbooked = F("capacity") - F("booked") + places if book else F("capacity") - F("booked")
+        changes = {"free_places": Greatest(Least(F("free_places") + places, unbooked), 0)}
+        if book:
+            changes["booked"] = F("booked") - places
+        if cls.objects.filter(session=session_id, date=date).update(**changes):
+            listing_cache.invalidate([date])
+            cls.publish(session_id, date, places)
+
+    @classmethod
+    def publish(cls, session_id, date, delta):
+        # The row is still locked by this transaction, so this is the count the commit leaves behind
+        free_places = cls.objects.filter(session=session_id, date=date).values_list("free_places", flat=True).get()
+        live.publish_delta(session_id, date, delta, free_places)
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, sessions, start_date=None):
+        sessions = list(sessions)
+        ids = [session.id for session in sessions]
+        counts = {"created": 0, "updated": 0, "deleted": 0}
+        if not ids:
+            return counts
+        booked = BookedSession.objects.filter(session__in=ids)
+        held = SeatHold.objects.filter(session__in=ids)
+        existing = cls.objects.filter(session__in=ids)
+        if start_date:
+            booked, held, existing = [query.filter(date__gte=start_date) for query in (booked, held, existing)]
+        # Claims wait on the locked rows, so no booking commits between counting and writing the counts
+        existing = {(day.session_id, day.date): day for day in existing.select_for_update().order_by("id")}
+        # Imports build sessions from hall ids, so sizes come from one query rather than one per session
+        sizes = dict(Hall.objects.filter(id__in={session.hall_id for session in sessions}).values_list("id", "size"))
+        booked, held = [dict(((session_id, date), places) for session_id, date, places in
+                             query.order_by().values("session", "date").annotate(total=Sum("places")).
+                             values_list("session", "date", "total"))
+                        for query in (booked, held)]
+
+        created, updated, dates = [], [], {date for session_id, date in existing}
+        for session in sessions:
+            # Days that stopped running keep their row while they still have bookings or holds
+            session_dates = set(session.running_days(start_date))
+            session_dates.update(date for session_id, date in set(booked) | set(held) if session_id == session.id)
+            dates.update(session_dates)
+            for date in session_dates:
+                key = (session.id, date)
+                capacity = sizes[session.hall_id]
+                places = booked.get(key, 0)
+                free_places = max(capacity - places - held.get(key, 0), 0)
+                day = existing.pop(key, None)
+                if day is None:
+                    created.append(cls(session=session, date=date, capacity=capacity, booked=places,
+                                       free_places=free_places))
+                elif (day.capacity, day.booked, day.free_places) != (capacity, places, free_places):
+                    day.capacity, day.booked, day.free_places = capacity, places, free_places
+                    updated.append(day)
+        cls.objects.bulk_create(created, batch_size=1000)
+        cls.objects.bulk_update(updated, ["capacity", "booked", "free_places"], batch_size=1000)
+        if existing:
+            cls.objects.filter(id__in=[day.id for day in existing.values()]).delete()
+        # Listings also show session times and prices, so every projected date is invalidated, not just changed rows
+        listing_cache.invalidate(dates)
+        counts.update(created=len(created), updated=len(updated), deleted=len(existing))
+        return counts
+
+
+class SeatHold(models.Model):
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="seat_holds")
+    user = models.ForeignKey(MyUser, on_delete=models.CASCADE, related_name="seat_holds")
+    date = models.DateField()
+    places = models.IntegerField(validators=[MinValueValidator(1)])
+    expires = models.DateTimeField(db_index=True)
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if self.id:
+            raise exceptions.IncorrectDataException
+        check_session_date(self.session, self.date)
+        self.expires = timezone.now() + timedelta(seconds=settings.SEAT_HOLD_TIME)
+        # Held places are taken from the inventory, so every listing already counts them as occupied
+        with transaction.atomic():
+            SessionDay.claim(self.session, self.date, self.places, book=False)
+            super().save(force_insert=False, force_update=False, using=None, update_fields=None)
+
+    def release(self):
+        with transaction.atomic():
+            deleted, _ = SeatHold.objects.filter(pk=self.pk).delete()
+            if deleted:
+                SessionDay.release(self.session_id, self.date, self.places, book=False)
+
+    def confirm(self):
+        with transaction.atomic():
+            deleted, _ = SeatHold.objects.filter(pk=self.pk, expires__gt=timezone.now()).delete()
+            if not deleted:
+                raise exceptions.HoldExpiredException
+            # The places are given back and claimed again by the booking while the inventory row stays locked
+            SessionDay.release(self.session_id, self.date, self.places, book=False)
+            booked_session = BookedSession(session=self.session, user=self.user, date=self.date, places=self.places)
+            booked_session.save()
+        return booked_session
+
+    @classmethod
+    def expire(cls, batch_size=1000):
+        expired = 0
+        while True:
+            with transaction.atomic():
+                holds = cls.objects.select_for_update(skip_locked=True).filter(expires__lte=timezone.now())
+                holds = list(holds.order_by("expires").values_list("id", "session", "date", "places")[:batch_size])
+                if not holds:
+                    return expired
+                released = defaultdict(int)
+                for hold_id, session_id, date, places in holds:
+                    released[(session_id, date)] += places
+                cls.objects.filter(id__in=[hold[0] for hold in holds]).delete()
+                for (session_id, date), places in sorted(released.items()):
+                    SessionDay.release(session_id, date, places, book=False)
+            expired += len(holds)
 
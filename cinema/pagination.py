@@ -0,0 +1,103 @@
+import json
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from binascii import Error as DecodeError
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+def encode_cursor(values, backwards=False):
+    data = json.dumps({"v": values, "b": backwards}, cls=DjangoJSONEncoder)
+    return urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, ordering, model):
+    try:
+        data = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values, backwards = data["v"], data["b"]
+    except (ValueError, TypeError, KeyError, DecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError("Invalid cursor")
+    # A well-formed cursor can still carry values the ordering fields would reject inside the query
+    try:
+        values = [model._meta.get_field(field).to_python(value) for field, value in zip(ordering, values)]
+    except (ValidationError, TypeError):
+        raise ValueError("Invalid cursor")
+    if None in values:
+        raise ValueError("Invalid cursor")
+    return values, bool(backwards)
+
+
+def keyset_condition(ordering, values, backwards=False):
+    # (a, b, c) > (x, y, z) spelled out as a > x OR a = x AND b > y OR ..., led by a range on the first field
+    lookup = "lt" if backwards else "gt"
+    condition = Q()
+    for index, field in enumerate(ordering):
+        equal = {ordering[i]: values[i] for i in range(index)}
+        condition |= Q(**equal, **{f"{field}__{lookup}": values[index]})
+    return Q(**{f"{ordering[0]}__{lookup}e": values[0]}) & condition
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate(queryset, ordering, cursor, page_size):
+    def position(obj):
+        return [getattr(obj, field) for field in ordering]
+
+    backwards = False
+    if cursor:
+        values, backwards = decode_cursor(cursor, ordering, queryset.model)
+        queryset = queryset.filter(keyset_condition(ordering, values, backwards))
+    if backwards:
+        queryset = queryset.order_by(*[f"-{field}" for field in ordering])
+    else:
+        queryset = queryset.order_by(*ordering)
+    object_list = list(queryset[:page_size + 1])
+    has_more = len(object_list) > page_size
+    object_list = object_list[:page_size]
+    if backwards:
+        object_list.reverse()
+    if not object_list:
+        return KeysetPage(object_list, None, None)
+    # Going forwards there is always a previous page behind a cursor, going backwards there is always a next one
+    has_next, has_previous = (True, has_more) if backwards else (has_more, bool(cursor))
+    return KeysetPage(object_list,
+                      encode_cursor(position(object_list[-1])) if has_next else None,
+                      encode_cursor(position(object_list[0]), backwards=True) if has_previous else None)
+
+
+class KeysetPaginationMixin:
+    keyset_ordering = None
+    cursor_kwarg = "cursor"
+
+    def paginate_queryset(self, queryset, page_size):
+        # Page numbers still work through the counting paginator, so old links keep their meaning
+        if self.page_kwarg in self.request.GET:
+            return super().paginate_queryset(queryset.order_by(*self.keyset_ordering), page_size)
+        try:
+            page = paginate(queryset, self.keyset_ordering, self.request.GET.get(self.cursor_kwarg), page_size)
+        except ValueError:
+            raise Http404("Invalid cursor")
+        return None, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,83 @@
+import copy
+from asyncio import iscoroutinefunction
+from contextvars import ContextVar
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import SimpleLazyObject, empty
+
+identity_map = ContextVar("identity_map", default=None)
+
+
+def cache_key(model, pk):
+    return f"reference:{model._meta.label_lower}:{pk}"
+
+
+def load(model, pk, timeout=None):
+    objects = identity_map.get()
+    if objects is not None and (model, pk) in objects:
+        return objects[(model, pk)]
+    obj = cache.get(cache_key(model, pk)) if timeout else None
+    if obj is None:
+        try:
+            obj = model.objects.get(pk=pk)
+        except model.DoesNotExist:
+            raise Http404(f"{model._meta.object_name} does not exist")
+        if timeout:
+            cache.set(cache_key(model, pk), obj, timeout=timeout)
+    if objects is not None:
+        objects[(model, pk)] = obj
+    return obj
+
+
+def forget(model, pk):
+    # Dropped again on commit, a reader may have cached the old row while the transaction was open
+    cache.delete(cache_key(model, pk))
+    transaction.on_commit(lambda: cache.delete(cache_key(model, pk)))
+
+
+class ModelReference(SimpleLazyObject):
+    # The primary key is known without a query, anything else loads the row on first use
+    def __init__(self, model, pk, timeout=None):
+        self.__dict__["_model"] = model
+        self.__dict__["_pk"] = pk
+        self.__dict__["_timeout"] = timeout
+        super().__init__(lambda: load(model, pk, timeout))
+
+    @property
+    def pk(self):
+        return self.__dict__["_pk"]
+
+    id = pk
+
+    def __copy__(self):
+        if self._wrapped is empty:
+            return type(self)(self._model, self._pk, self._timeout)
+        return copy.copy(self._wrapped)
+
+    def __deepcopy__(self, memo):
+        if self._wrapped is empty:
+            result = memo[id(self)] = type(self)(self._model, self._pk, self._timeout)
+            return result
+        return copy.deepcopy(self._wrapped, memo)
+
+
+@sync_and_async_middleware
+def identity_map_middleware(get_response):
+    # References to the same row share one instance and one query for the rest of the request
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = identity_map.set({})
+            try:
+                return await get_response(request)
+            finally:
+                identity_map.reset(token)
+    else:
+        def middleware(request):
+            token = identity_map.set({})
+            try:
+                return get_response(request)
+            finally:
+                identity_map.reset(token)
+    return middleware
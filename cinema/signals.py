@@ -0,0 +1,43 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.db.models import F
+from customuser.models import MyUser
+from .models import Hall, Session, BookedSession, SessionDay, SessionSlot
+from . import listing_cache, references
+
+
+@receiver(post_save, sender=Session)
+def index_loaded_session(sender, instance, raw, **kwargs):
+    if raw:
+        SessionSlot.index(instance)
+        SessionDay.rebuild([instance])
+
+
+@receiver(post_save, sender=BookedSession)
+def claim_loaded_places(sender, instance, created, raw, **kwargs):
+    # Fixtures are loaded without calling save(), so seats have to be claimed here
+    if raw and created:
+        SessionDay.claim(instance.session, instance.date, instance.places)
+        BookedSession.flag_booked([instance.session])
+        if not instance.amount:
+            instance.amount = instance.session.price * instance.places
+            BookedSession.objects.filter(pk=instance.pk).update(amount=instance.amount)
+        MyUser.objects.filter(pk=instance.user_id).update(total_spent=F("total_spent") + instance.amount)
+
+
+@receiver(post_delete, sender=BookedSession)
+def release_places(sender, instance, **kwargs):
+    SessionDay.release(instance.session_id, instance.date, instance.places)
+    MyUser.objects.filter(pk=instance.user_id).update(total_spent=F("total_spent") - instance.amount)
+    BookedSession.reconcile_flags([instance.session_id])
+
+
+@receiver(post_delete, sender=Session)
+def invalidate_session_dates(sender, instance, **kwargs):
+    listing_cache.invalidate(instance.running_days())
+
+
+@receiver(post_save, sender=Hall)
+@receiver(post_delete, sender=Hall)
+def forget_cached_hall(sender, instance, **kwargs):
+    references.forget(Hall, instance.pk)
@@ -1,6 +1,8 @@
 import datetime
 
 from django import template
+from cinema.forms import WEEKDAYS
+from cinema.models import ALL_WEEKDAYS
 
 register = template.Library()
 
@@ -13,3 +15,10 @@ def plus_days(value, days):
 @register.simple_tag
 def current_date():
     return datetime.datetime.now().date()
+
+
+@register.filter
+def weekday_names(value):
+    if value == ALL_WEEKDAYS:
+        return "Every day"
+    return ", ".join(name[:3] for day, name in WEEKDAYS if value & (1 << day))
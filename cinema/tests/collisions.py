@@ -0,0 +1,35 @@
+import random
+from datetime import date, time, timedelta
+from django.db.models import Q, F
+from cinema.models import Session, SessionSlot
+
+
+def q_collisions(session):
+    # Reference implementation: the query Session.save() used before the slot index
+    sessions = Session.objects.filter(start_date__lte=session.end_date, end_date__gte=session.start_date,
+                                      hall=session.hall)
+    if session.start_time > session.end_time:
+        condition = (
+                Q(start_time__gt=F('end_time')) |
+                Q(start_time__lte=session.end_time) |
+                Q(end_time__gte=session.start_time)
+        )
+    else:
+        condition = (
+                Q(start_time__gt=F('end_time'), start_time__lte=session.end_time) |
+                Q(start_time__gt=F('end_time'), end_time__gte=session.start_time) |
+                Q(start_time__lte=session.end_time, end_time__gte=session.start_time)
+        )
+    return sessions.filter(condition)
+
+
+def random_session(hall, days=60, lengths=(0, 10)):
+    start_date = date(2021, 10, 1) + timedelta(days=random.randint(0, days))
+    return Session(start_time=time(random.randint(0, 23), random.choice([0, 15, 30, 45])),
+                   end_time=time(random.randint(0, 23), random.choice([0, 15, 30, 45])),
+                   start_date=start_date, end_date=start_date + timedelta(days=random.randint(*lengths)),
+                   hall=hall, price=10)
+
+
+def slot_collisions(session):
+    return set(SessionSlot.collisions(session).values_list("session", flat=True))
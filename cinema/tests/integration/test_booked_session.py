@@ -1,8 +1,9 @@
 from datetime import date, time
 from django.test import TestCase
+from django.utils import timezone
 from django.urls import reverse
 from django.db.models import ObjectDoesNotExist
-from cinema.models import Session, BookedSession, Hall
+from cinema.models import Session, BookedSession, Hall, SeatHold, SessionDay
 from customuser.models import MyUser
 
 
@@ -17,6 +18,15 @@ class TestBookedSession(TestCase):
         self.session = Session.objects.get(id=1)
         self.hall = Hall.objects.get(id=1)
 
+    def book(self, session, date):
+        # Seats are held first and paid for on the confirmation page
+        response = self.client.post(reverse("cinema:booksession", args=[session, date]), data={"places": 1},
+                                    follow=True)
+        hold = SeatHold.objects.order_by("-id").first()
+        if hold is None:
+            return response
+        return self.client.post(reverse("cinema:confirmseathold", args=[hold.pk]), follow=True)
+
     def test_unathorized_not_allowed(self):
         response = self.client.get(reverse("cinema:booksession", args=[self.session, date(2021, 10, 5)]))
         self.assertRedirects(response, reverse("customuser:login") + "?next=/cinema/booksession/1/2021-10-05/")
@@ -29,6 +39,16 @@ class TestBookedSession(TestCase):
         message = "No free places"
         self.assertEqual(message, str(list(messages)[0]))
 
+    def test_other_weekday_error(self):
+        session = Session.objects.create(start_time=time(10, 30), end_time=time(13, 20),
+                                         start_date=date(2021, 11, 1), end_date=date(2021, 11, 30),
+                                         weekdays=0b1, hall=self.hall, price=16)
+        self.client.force_login(self.user)
+        response = self.client.post(reverse("cinema:booksession", args=[session, date(2021, 11, 2)]),
+                                    data={"places": 1}, follow=True)
+        self.assertEqual("Incorrect data", str(list(response.context["messages"])[0]))
+        self.assertFalse(BookedSession.objects.filter(session=session).exists())
+
     def test_date_expired_error(self):
         session = Session.objects.create(start_time=time(10, 30), end_time=time(13, 20),
                                          start_date=date(2021, 5, 1), end_date=date(2021, 6, 1),
@@ -57,40 +77,85 @@ class TestBookedSession(TestCase):
     def test_not_enough_money_message(self):
         user = MyUser.objects.create_user(username="ppl", password="1", wallet=0)
         self.client.force_login(user)
-        response = self.client.post(reverse("cinema:booksession", args=[self.session, date(2021, 10, 10)]),
-                                    data={"places": 1}, follow=True)
+        response = self.book(self.session, date(2021, 10, 10))
         messages = response.context["messages"]
         message = "Not enough money"
         self.assertEqual(message, str(list(messages)[0]))
 
     def test_correct_creation(self):
         self.client.force_login(self.user)
-        response = self.client.post(reverse("cinema:booksession", args=[self.session, date(2021, 10, 5)]),
-                                    data={"places": 1}, follow=True)
-        session = BookedSession.objects.get(id=4)
-        self.assertTrue(session)
+        response = self.book(self.session, date(2021, 10, 5))
+        self.assertTrue(BookedSession.objects.get(id=6))
 
     def test_correct_creation_message(self):
         self.client.force_login(self.user)
-        response = self.client.post(reverse("cinema:booksession", args=[self.session, date(2021, 10, 5)]),
-                                    data={"places": 1}, follow=True)
+        response = self.book(self.session, date(2021, 10, 5))
         messages = response.context["messages"]
         message = "Session was booked"
         self.assertEqual(message, str(list(messages)[0]))
 
     def test_correct_creation_redirect(self):
         self.client.force_login(self.user)
-        response = self.client.post(reverse("cinema:booksession", args=[self.session, date(2021, 10, 5)]),
-                                    data={"places": 1}, follow=True)
+        response = self.book(self.session, date(2021, 10, 5))
         self.assertRedirects(response, "/")
 
     def test_incorrect_data(self):
         self.client.force_login(self.user)
-        response = self.client.post(reverse("cinema:booksession", args=[self.session, date(2021, 10, 5)]),
-                                    data={"places": 1}, follow=True)
+        response = self.book(self.session, date(2021, 10, 5))
         self.assertRedirects(response, "/")
 
 
+class TestSeatHoldCheckout(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.user = MyUser.objects.get(id=2)
+        self.session = Session.objects.get(id=3)
+        self.client.force_login(self.user)
+        self.response = self.client.post(reverse("cinema:booksession", args=[self.session, date(2021, 10, 5)]),
+                                         data={"places": 2})
+        self.hold = SeatHold.objects.get(user=self.user)
+
+    def test_hold_takes_places_not_money(self):
+        self.assertRedirects(self.response, reverse("cinema:seathold", args=[self.hold.pk]))
+        self.assertEqual(1, SessionDay.get_free_places(self.session, date(2021, 10, 5)))
+        self.assertEqual(10000000, MyUser.objects.get(id=2).wallet)
+        self.assertFalse(BookedSession.objects.filter(user=self.user).exists())
+
+    def test_hold_page(self):
+        response = self.client.get(reverse("cinema:seathold", args=[self.hold.pk]))
+        self.assertTemplateUsed(response, "seat_hold.html")
+        self.assertEqual(self.session.price * 2, response.context["price"])
+
+    def test_confirm(self):
+        self.client.post(reverse("cinema:confirmseathold", args=[self.hold.pk]))
+        self.assertEqual(2, BookedSession.objects.get(user=self.user).places)
+        self.assertEqual(10000000 - self.session.price * 2, MyUser.objects.get(id=2).wallet)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_release(self):
+        response = self.client.post(reverse("cinema:releaseseathold", args=[self.hold.pk]))
+        self.assertRedirects(response, "/", fetch_redirect_response=False)
+        self.assertEqual(3, SessionDay.get_free_places(self.session, date(2021, 10, 5)))
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_expired_hold(self):
+        SeatHold.objects.update(expires=timezone.now())
+        self.assertEqual(404, self.client.get(reverse("cinema:seathold", args=[self.hold.pk])).status_code)
+        response = self.client.post(reverse("cinema:confirmseathold", args=[self.hold.pk]), follow=True)
+        self.assertEqual("Hold expired", str(list(response.context["messages"])[0]))
+        self.assertEqual(3, SessionDay.get_free_places(self.session, date(2021, 10, 5)))
+
+    def test_other_users_hold(self):
+        self.client.force_login(MyUser.objects.get(id=3))
+        self.assertEqual(404, self.client.get(reverse("cinema:seathold", args=[self.hold.pk])).status_code)
+        self.assertEqual(404, self.client.post(reverse("cinema:confirmseathold", args=[self.hold.pk])).status_code)
+        self.assertEqual(404, self.client.post(reverse("cinema:releaseseathold", args=[self.hold.pk])).status_code)
+
+
 class TestBookedSessionList(TestCase):
     fixtures = ["fixtures/users.json"]
 
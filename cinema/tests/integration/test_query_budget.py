@@ -0,0 +1,58 @@
+from datetime import date, time
+from django.test import TestCase
+from django.urls import reverse
+from customuser.models import MyUser
+from cinema.models import Hall, Session, BookedSession
+from cinema import listing_cache
+from cinema.tests.query_budget import QueryBudgetMixin
+
+
+class TestQueryBudget(QueryBudgetMixin, TestCase):
+    # Signed in requests also read the session and the user and save the session back in three statements
+    def setUp(self) -> None:
+        listing_cache.get_cache().clear()
+        self.user = MyUser.objects.create_user(username="darkin", password="1", wallet=10000, is_superuser=True)
+        sessions = [Session(start_time=time(10), end_time=time(11), start_date=date(2021, 10, 1),
+                            end_date=date(2021, 10, 10), hall=Hall.objects.create(name=f"hall{i}", size=100),
+                            price=i)
+                    for i in range(60)]
+        Session.import_many(sessions)
+        BookedSession.objects.bulk_create([BookedSession(session=session, user=self.user, date=date(2021, 10, 4),
+                                                         places=1) for session in sessions])
+
+    def test_client_session_list(self):
+        response = self.assertViewQueryBudget(2, reverse("cinema:clientsessionlist", args=[date(2021, 10, 4)]))
+        self.assertEqual(50, len(response.context_data["object_list"]))
+        self.assertContains(response, response.context_data["object_list"][49].hall.name)
+
+    def test_client_session_list_signed_in(self):
+        self.client.force_login(self.user)
+        self.assertViewQueryBudget(7, reverse("cinema:clientsessionlist", args=[date(2021, 10, 4), "price"]))
+
+    def test_session_list(self):
+        self.client.force_login(self.user)
+        response = self.assertViewQueryBudget(6, reverse("cinema:sessionlist"))
+        self.assertContains(response, "hall49")
+
+    def test_session_list_page_number(self):
+        self.client.force_login(self.user)
+        self.assertViewQueryBudget(7, reverse("cinema:sessionlist"), data={"page": 2})
+
+    def test_booked_sessions_list(self):
+        self.client.force_login(self.user)
+        response = self.assertViewQueryBudget(6, reverse("cinema:bookedsessionlist"))
+        self.assertContains(response, "hall49")
+
+    def test_import_reads_halls_once(self):
+        sessions = [Session(start_time=time(12), end_time=time(13), start_date=date(2021, 10, 1),
+                            end_date=date(2021, 10, 10), hall_id=hall_id, price=1)
+                    for hall_id in Hall.objects.values_list("id", flat=True)]
+        with self.assertQueryBudget(len(sessions) + 20) as context:
+            self.assertEqual([], Session.import_many(sessions))
+        self.assertEqual(1, sum('FROM "cinema_hall"' in query["sql"] for query in context.captured_queries))
+
+    def test_budget_exceeded(self):
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(1):
+                list(Hall.objects.all())
+                list(Session.objects.all())
@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    @contextmanager
+    def assertQueryBudget(self, budget, using="default"):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(f"{number}. {query['sql']}"
+                                for number, query in enumerate(context.captured_queries, start=1))
+            self.fail(f"{executed} queries executed, the budget is {budget}:\n{queries}")
+
+    def assertViewQueryBudget(self, budget, url, **extra):
+        with self.assertQueryBudget(budget):
+            response = self.client.get(url, **extra)
+        self.assertEqual(200, response.status_code)
+        return response
@@ -1,7 +1,10 @@
 from django.test import TestCase
 from datetime import date, time
 from cinema.misc import DateConverter, SessionConverter, TimeConverter, HallConverter
+from django.core.cache import cache
+from django.http import Http404
 from cinema.models import Session, Hall
+from cinema.references import cache_key, identity_map, identity_map_middleware
 
 
 class TestDateConverter(TestCase):
@@ -35,8 +38,17 @@ class TestSessionConverter(TestCase):
             self.session_converter.to_python("wffsdsdf")
 
     def test_not_existing_data(self):
-        with self.assertRaises(ValueError):
-            self.session_converter.to_python("4")
+        session = self.session_converter.to_python("4")
+        with self.assertRaises(Http404):
+            session.price
+
+    def test_lazy_reference(self):
+        with self.assertNumQueries(0):
+            session = self.session_converter.to_python("3")
+            self.assertEqual("3", self.session_converter.to_url(session))
+        price = Session.objects.get(id=3).price
+        with self.assertNumQueries(1):
+            self.assertEqual(price, session.price)
 
     def test_existing_session(self):
         session = self.session_converter.to_python("3")
@@ -77,8 +89,9 @@ class TestHallConverter(TestCase):
             self.hall_converter.to_python("wffsdsdf")
 
     def test_not_existing_data(self):
-        with self.assertRaises(ValueError):
-            self.hall_converter.to_python("4")
+        hall = self.hall_converter.to_python("4")
+        with self.assertRaises(Http404):
+            hall.name
 
     def test_existing_hall(self):
         hall = self.hall_converter.to_python("3")
@@ -88,3 +101,33 @@ class TestHallConverter(TestCase):
         hall = Hall.objects.get(id=1)
         self.assertEqual("1", self.hall_converter.to_url(hall))
 
+    def test_cached_hall(self):
+        cache.delete(cache_key(Hall, 3))
+        self.hall_converter.to_python("3").name
+        name = Hall.objects.get(id=3).name
+        with self.assertNumQueries(0):
+            self.assertEqual(name, self.hall_converter.to_python("3").name)
+
+    def test_saved_hall_not_cached(self):
+        self.hall_converter.to_python("1").name
+        Hall.objects.filter(id=1).update(name="renamed")
+        Hall.objects.get(id=1).save()
+        self.assertEqual("renamed", self.hall_converter.to_python("1").name)
+
+
+class TestIdentityMap(TestCase):
+    fixtures = ["fixtures/halls.json",
+                "fixtures/sessions.json"]
+
+    def test_one_instance_per_request(self):
+        converter = SessionConverter()
+
+        def view(request):
+            first, second = converter.to_python("1"), converter.to_python("1")
+            with self.assertNumQueries(1):
+                self.assertEqual(first.price, second.price)
+            self.assertIs(first._wrapped, second._wrapped)
+            return "response"
+
+        self.assertEqual("response", identity_map_middleware(view)(None))
+        self.assertIsNone(identity_map.get())
@@ -1,7 +1,7 @@
 from django.test import TestCase
 from cinema.models import Hall, Session
 from customuser.models import MyUser
-from cinema.forms import HallForm, SessionForm, BookedSessionForm
+from cinema.forms import HallForm, SessionForm, SeatHoldForm
 
 
 class TestHallForm(TestCase):
@@ -73,10 +73,10 @@ class TestSessionForm(TestCase):
         self.assertTrue(self.correct_form.is_valid())
 
 
-class TestBookedSessionForm(TestCase):
+class TestSeatHoldForm(TestCase):
 
     def test_min_value_validator(self):
-        form = BookedSessionForm(data={"places": 0})
+        form = SeatHoldForm(data={"places": 0})
         form.is_valid()
         error = "Ensure this value is greater than or equal to 1."
         self.assertEqual(error, form._errors["places"][0])
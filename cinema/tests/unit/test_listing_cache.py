@@ -0,0 +1,168 @@
+from datetime import date, time
+from io import StringIO
+from rest_framework.test import APIClient
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.cache.utils import make_template_fragment_key
+from django.urls import reverse
+from django.utils.http import http_date
+from customuser.models import MyUser
+from cinema.models import Hall, Session, BookedSession
+from cinema import listing_cache
+
+
+class TestListingCache(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        listing_cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = MyUser.objects.get(id=2)
+        self.session = Session.objects.get(id=3)
+        self.url = reverse("api:clients-session-list", args=[date(2021, 10, 4), "price"])
+        self.client.get(self.url)
+
+    def free_places(self):
+        data = self.client.get(self.url).data["results"]
+        return {elem["id"]: elem["free_places"] for elem in data}[self.session.id]
+
+    def test_hit(self):
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        self.assertEqual({"hits": 1, "misses": 1}, listing_cache.stats())
+
+    def test_booking_invalidates_date(self):
+        BookedSession.objects.create(user=self.user, session=self.session, date=date(2021, 10, 4), places=2)
+        self.assertEqual(1, self.free_places())
+        self.assertEqual({"hits": 0, "misses": 2}, listing_cache.stats())
+
+    def test_booking_keeps_other_dates(self):
+        BookedSession.objects.create(user=self.user, session=self.session, date=date(2021, 10, 5), places=2)
+        self.assertEqual(3, self.free_places())
+        self.assertEqual({"hits": 1, "misses": 1}, listing_cache.stats())
+
+    def test_session_save_invalidates_date(self):
+        session = Session(start_time=time(20), end_time=time(21), start_date=date(2021, 10, 1),
+                          end_date=date(2021, 10, 10), hall=Hall.objects.get(id=1), price=5)
+        session.save()
+        data = self.client.get(self.url).data["results"]
+        self.assertIn(session.id, [elem["id"] for elem in data])
+
+    def test_hall_rename_invalidates_dates(self):
+        url = reverse("cinema:clientsessionlist", args=[date(2021, 10, 4)])
+        self.client.get(url)
+        etag = listing_cache.listing_etag(date(2021, 10, 4))
+        hall = Hall.objects.get(id=3)
+        hall.name = "renamed"
+        hall.save()
+        self.assertNotEqual(etag, listing_cache.listing_etag(date(2021, 10, 4)))
+        self.assertContains(self.client.get(url), "renamed")
+
+    def test_commit_drops_pages_cached_in_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BookedSession.objects.create(user=self.user, session=self.session, date=date(2021, 10, 4), places=2)
+            self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual({"hits": 0, "misses": 3}, listing_cache.stats())
+
+    def test_html_hit(self):
+        url = reverse("cinema:clientsessionlist", args=[date(2021, 10, 4)])
+        first = self.client.get(url)
+        second = self.client.get(url)
+        self.assertEqual(list(first.context_data["object_list"]), list(second.context_data["object_list"]))
+        self.assertEqual(3, second.context_data["paginator"].count)
+        self.assertEqual({"hits": 1, "misses": 2}, listing_cache.stats())
+
+    def test_stats_command(self):
+        out = StringIO()
+        call_command("listing_cache_stats", "--reset", stdout=out)
+        self.assertIn("0 hits, 1 misses", out.getvalue())
+        self.assertEqual({"hits": 0, "misses": 0}, listing_cache.stats())
+
+
+class TestConditionalListing(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        listing_cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = MyUser.objects.get(id=2)
+        self.session = Session.objects.get(id=3)
+        self.url = reverse("api:clients-session-list", args=[date(2021, 10, 4)])
+        self.response = self.client.get(self.url)
+
+    def test_validators(self):
+        self.assertTrue(self.response.has_header("ETag"))
+        self.assertFalse(self.response.has_header("Last-Modified"))
+
+    def test_not_modified(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.response["ETag"])
+        self.assertEqual(304, response.status_code)
+
+    def test_modified_since_not_trusted(self):
+        # A change within the same second would keep the same Last-Modified, only the ETag validates
+        BookedSession.objects.create(user=self.user, session=self.session, date=date(2021, 10, 4), places=2)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(200, response.status_code)
+
+    def test_modified_after_booking(self):
+        BookedSession.objects.create(user=self.user, session=self.session, date=date(2021, 10, 4), places=2)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.response["ETag"])
+        self.assertEqual(200, response.status_code)
+
+    def test_sessions_in_time(self):
+        url = reverse("api:today-session-list", args=[time(10), time(20)])
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(304, response.status_code)
+
+    def test_html_anonymous(self):
+        url = reverse("cinema:clientsessionlist", args=[date(2021, 10, 4)])
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(304, response.status_code)
+
+    def test_html_signed_in(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("cinema:clientsessionlist", args=[date(2021, 10, 4)]))
+        self.assertFalse(response.has_header("ETag"))
+
+
+class TestSessionTableFragment(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        listing_cache.get_cache().clear()
+        self.user = MyUser.objects.get(id=2)
+        self.url = reverse("cinema:clientsessionlist", args=[date(2021, 10, 4)])
+        self.client.get(self.url)
+
+    def test_fragment_key(self):
+        key = make_template_fragment_key("session_table", [date(2021, 10, 4), None, 1,
+                                                           listing_cache.version(date(2021, 10, 4)), False])
+        self.assertIn("hall3", listing_cache.get_cache().get(key))
+
+    def test_fragment_reused(self):
+        Hall.objects.filter(id=3).update(name="renamed")
+        self.assertNotContains(self.client.get(self.url), "renamed")
+
+    def test_fragment_invalidated(self):
+        Hall.objects.filter(id=3).update(name="renamed")
+        BookedSession.objects.create(user=self.user, session=Session.objects.get(id=3), date=date(2021, 10, 4),
+                                     places=1)
+        self.assertContains(self.client.get(self.url), "renamed")
+
+    def test_buy_links_for_signed_in_users(self):
+        self.assertNotContains(self.client.get(self.url), "Buy")
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(self.url), "Buy", count=3)
@@ -0,0 +1,87 @@
+import json
+from datetime import date
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.test import TestCase
+from cinema.live import LocalTransport, broker, router, session_channel
+from cinema.models import Session, BookedSession
+from cinema.exceptions import NoFreePlacesException
+from customuser.models import MyUser
+
+
+class TestLocalTransport(TestCase):
+    def test_fan_out(self):
+        transport = LocalTransport()
+        received = []
+        transport.subscribe("a", received.append)
+        transport.subscribe("a", lambda message: received.append(message.upper()))
+        transport.publish("a", "x")
+        transport.publish("b", "y")
+        self.assertEqual(["X", "x"], sorted(received))
+
+    def test_unsubscribe(self):
+        transport = LocalTransport()
+        received = []
+        transport.subscribe("a", received.append)
+        transport.unsubscribe("a", received.append)
+        transport.publish("a", "x")
+        self.assertEqual([], received)
+
+
+class TestLiveSeats(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.session = Session.objects.get(id=3)
+        self.user = MyUser.objects.get(id=1)
+        self.received = []
+        self.channel = session_channel(self.session.id, date(2021, 10, 4))
+        broker.transport.subscribe(self.channel, self.received.append)
+
+    def tearDown(self) -> None:
+        broker.transport.unsubscribe(self.channel, self.received.append)
+
+    def test_booking_publishes_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BookedSession.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=2)
+            self.assertEqual([], self.received)
+        self.assertEqual([{"session": 3, "date": "2021-10-04", "delta": -2, "free_places": 1}],
+                         [json.loads(message) for message in self.received])
+
+    def test_failed_booking_publishes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(NoFreePlacesException):
+                BookedSession.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=4)
+        self.assertEqual([], self.received)
+
+    def test_stream(self):
+        async def listen():
+            communicator = ApplicationCommunicator(router(None), {"type": "http", "method": "GET",
+                                                                  "path": "/live/seats/2021-10-04/3/"})
+            await communicator.send_input({"type": "http.request"})
+            start = await communicator.receive_output(1)
+            snapshot = await communicator.receive_output(1)
+            broker.publish(3, date(2021, 10, 4), -1, 2)
+            delta = await communicator.receive_output(1)
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(1)
+            return start, snapshot, delta
+
+        start, snapshot, delta = async_to_sync(listen)()
+        self.assertEqual(200, start["status"])
+        self.assertIn(b'"free_places": {"3": 3}', snapshot["body"])
+        self.assertTrue(delta["body"].startswith(b"event: delta\ndata: "))
+        self.assertIn(b'"free_places": 2', delta["body"])
+
+    def test_other_paths_go_to_django(self):
+        async def request():
+            async def application(scope, receive, send):
+                await send({"type": "http.response.start", "status": 204, "headers": []})
+            communicator = ApplicationCommunicator(router(application), {"type": "http", "method": "GET",
+                                                                         "path": "/api/halls/"})
+            return await communicator.receive_output(1)
+
+        self.assertEqual(204, async_to_sync(request)()["status"])
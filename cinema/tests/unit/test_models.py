@@ -1,10 +1,21 @@
-from datetime import date, time
-from django.test import TestCase
-from cinema.models import Hall, Session, BookedSession
+from datetime import date, time, timedelta
+from io import StringIO
+import random
+from unittest import skipIf
+from threading import Barrier, Thread
+from django.db.models import Sum
+from django.db import connection
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from cinema.models import Hall, Session, BookedSession, SessionDay, SeatHold, SessionSlot, ALL_WEEKDAYS
 from django.db.utils import IntegrityError
 from cinema.exceptions import SessionsCollideException, NoFreePlacesException, \
-    IncorrectDataException, BookedSessionExistsException, DateExpiredException, NotEnoughMoneyException
+    IncorrectDataException, BookedSessionExistsException, DateExpiredException, NotEnoughMoneyException, \
+    HoldExpiredException
 from customuser.models import MyUser
+from cinema.tests.collisions import q_collisions, random_session, slot_collisions
 
 
 class TestHall(TestCase):
@@ -35,6 +46,10 @@ class TestHall(TestCase):
         with self.assertRaises(BookedSessionExistsException):
             self.hall.save()
 
+    def test_explicit_id_created(self):
+        Hall(id=777, name="hall777", size=10).save()
+        self.assertEqual("hall777", Hall.objects.get(id=777).name)
+
 
 class TestSession(TestCase):
 
@@ -60,6 +75,13 @@ class TestSession(TestCase):
         self.session2.save()
         self.midnight_session.save()
 
+    def test_explicit_id_created(self):
+        session = self.create_session(time(hour=16), time(hour=18), date(year=2021, month=10, day=1),
+                                      date(year=2021, month=11, day=3), self.hall1, 10)
+        session.id = 555
+        session.save()
+        self.assertEqual(time(hour=16), Session.objects.get(id=555).start_time)
+
     def test_incorrect_session_update2(self):
         with self.assertRaises(SessionsCollideException):
             self.session1.start_date = date(year=2021, month=8, day=6)
@@ -181,6 +203,79 @@ class TestSession(TestCase):
             self.session1.save()
 
 
+class TestSessionSlot(TestCase):
+
+    def setUp(self) -> None:
+        random.seed(0)
+        self.hall = Hall.objects.create(name="hall", size=10)
+        Session.objects.bulk_create([random_session(self.hall) for i in range(200)])
+        for session in Session.objects.all():
+            SessionSlot.index(session)
+
+    def test_midnight_session_split(self):
+        session = Session.objects.create(start_time=time(23), end_time=time(2), start_date=date(2022, 1, 1),
+                                         end_date=date(2022, 1, 2), hall=self.hall, price=10)
+        self.assertEqual(4, session.slots.count())
+
+    def test_matches_q_collisions(self):
+        for i in range(300):
+            session = random_session(self.hall)
+            self.assertEqual(set(q_collisions(session).values_list("id", flat=True)), slot_collisions(session))
+
+    def test_find_conflicts_matches_slots(self):
+        Session.objects.filter(id__lte=100).update(weekdays=0b0101010)
+        for session in Session.objects.all():
+            SessionSlot.index(session)
+        for i in range(100):
+            session = random_session(self.hall)
+            session.weekdays = random.randint(1, ALL_WEEKDAYS)
+            conflicts = {other.id for index, other_index, other in Session.find_conflicts([session])}
+            self.assertEqual(slot_collisions(session), conflicts)
+
+    def test_update_reindexes(self):
+        session = Session.objects.create(start_time=time(10), end_time=time(11), start_date=date(2022, 1, 1),
+                                         end_date=date(2022, 1, 2), hall=self.hall, price=10)
+        session.start_time = time(9)
+        session.save()
+        self.assertEqual({time(9)}, set(session.slots.values_list("start_time", flat=True)))
+
+
+class TestSessionWeekdays(TestCase):
+
+    def setUp(self) -> None:
+        self.user = MyUser.objects.create_user(username="darkin", password="1")
+        self.hall = Hall.objects.create(name="hall", size=10)
+        # 2021-10-4 is a Monday
+        self.session = Session.objects.create(start_time=time(12), end_time=time(14), start_date=date(2021, 10, 4),
+                                              end_date=date(2021, 10, 31), weekdays=0b0000101, hall=self.hall,
+                                              price=10)
+
+    def test_runs_on(self):
+        self.assertTrue(self.session.runs_on(date(2021, 10, 6)))
+        self.assertFalse(self.session.runs_on(date(2021, 10, 5)))
+
+    def test_running_on(self):
+        self.assertTrue(Session.objects.running_on(date(2021, 10, 11)).exists())
+        self.assertFalse(Session.objects.running_on(date(2021, 10, 12)).exists())
+
+    def test_slots_on_running_days(self):
+        self.assertEqual(8, self.session.slots.count())
+
+    def test_other_weekdays_not_collide(self):
+        session = Session.objects.create(start_time=time(12), end_time=time(14), start_date=date(2021, 10, 1),
+                                         end_date=date(2021, 11, 30), weekdays=0b1111010, hall=self.hall, price=10)
+        self.assertTrue(session.id)
+
+    def test_same_weekday_collide(self):
+        with self.assertRaises(SessionsCollideException):
+            Session.objects.create(start_time=time(13), end_time=time(15), start_date=date(2021, 10, 27),
+                                   end_date=date(2021, 11, 30), weekdays=0b0000100, hall=self.hall, price=10)
+
+    def test_booking_on_other_weekday(self):
+        with self.assertRaises(IncorrectDataException):
+            BookedSession.objects.create(session=self.session, user=self.user, date=date(2021, 10, 5), places=1)
+
+
 class TestBookedSession(TestCase):
     fixtures = ["fixtures/users.json",
                 "fixtures/halls.json",
@@ -259,4 +354,276 @@ class TestBookedSession(TestCase):
             BookedSession.objects.create(session=self.fully_booked_session, places=1, user=user, date=date(2021, 10, 7))
 
 
+class TestSessionDay(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.session = Session.objects.get(id=3)
+        self.user = MyUser.objects.get(id=1)
+
+    def test_loaded_bookings_claim_places(self):
+        self.assertEqual(0, SessionDay.objects.get(session_id=1, date=date(2021, 10, 4)).free_places)
+
+    def test_free_places_without_bookings(self):
+        self.assertEqual(3, SessionDay.get_free_places(self.session, date(2021, 10, 4)))
+
+    def test_booking_claims_places(self):
+        BookedSession.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=2)
+        self.assertEqual(1, SessionDay.get_free_places(self.session, date(2021, 10, 4)))
+
+    def test_failed_booking_keeps_places(self):
+        user = MyUser.objects.create_user(username="ppl", password="1", wallet=0)
+        with self.assertRaises(NotEnoughMoneyException):
+            BookedSession.objects.create(session=self.session, user=user, date=date(2021, 10, 4), places=2)
+        self.assertEqual(3, SessionDay.get_free_places(self.session, date(2021, 10, 4)))
+
+    def test_deleted_booking_releases_places(self):
+        booked_session = BookedSession.objects.create(session=self.session, user=self.user,
+                                                      date=date(2021, 10, 4), places=2)
+        booked_session.delete()
+        self.assertEqual(3, SessionDay.get_free_places(self.session, date(2021, 10, 4)))
+
+    def test_row_for_every_running_day(self):
+        self.assertEqual(26, SessionDay.objects.filter(session=self.session).count())
+
+    def test_booking_counts_places(self):
+        BookedSession.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=2)
+        day = SessionDay.objects.get(session=self.session, date=date(2021, 10, 4))
+        self.assertEqual((3, 2, 1), (day.capacity, day.booked, day.free_places))
+
+    def test_session_update_moves_days(self):
+        self.session.end_date = date(2021, 10, 10)
+        self.session.save()
+        self.assertEqual(8, SessionDay.objects.filter(session=self.session).count())
+
+    def test_stopped_day_not_running(self):
+        SeatHold.objects.create(session=self.session, user=self.user, date=date(2021, 10, 20), places=1)
+        self.session.end_date = date(2021, 10, 10)
+        self.session.save()
+        self.assertTrue(SessionDay.objects.filter(session=self.session, date=date(2021, 10, 20)).exists())
+        self.assertNotIn(self.session, Session.objects.running_on(date(2021, 10, 20)))
+        self.assertIn(self.session, Session.objects.running_on(date(2021, 10, 4)))
+        SeatHold.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=1)
+        self.session.weekdays = ALL_WEEKDAYS & ~(1 << date(2021, 10, 4).weekday())
+        self.session.end_date = date(2021, 10, 28)
+        self.session.save()
+        self.assertTrue(SessionDay.objects.filter(session=self.session, date=date(2021, 10, 4)).exists())
+        self.assertNotIn(self.session, Session.objects.running_on(date(2021, 10, 4)))
+
+    def test_hall_resize_updates_days(self):
+        hall = Hall.objects.create(name="resized", size=5)
+        session = Session.objects.create(start_time=time(10), end_time=time(11), start_date=date(2021, 10, 3),
+                                         end_date=date(2021, 10, 5), hall=hall, price=10)
+        SeatHold.objects.create(session=session, user=self.user, date=date(2021, 10, 4), places=2)
+        hall.size = 8
+        hall.save()
+        day = SessionDay.objects.get(session=session, date=date(2021, 10, 4))
+        self.assertEqual((8, 0, 6), (day.capacity, day.booked, day.free_places))
+
+    def shrunk_hall_hold(self):
+        hall = Hall.objects.create(name="shrunk", size=5)
+        session = Session.objects.create(start_time=time(10), end_time=time(11), start_date=date(2021, 10, 3),
+                                         end_date=date(2021, 10, 5), hall=hall, price=10)
+        hold = SeatHold.objects.create(session=session, user=self.user, date=date(2021, 10, 4), places=2)
+        hall.size = 1
+        hall.save()
+        return hold
+
+    def test_release_after_shrink_capped(self):
+        hold = self.shrunk_hall_hold()
+        hold.release()
+        day = SessionDay.objects.get(session=hold.session, date=date(2021, 10, 4))
+        self.assertEqual((1, 0, 1), (day.capacity, day.booked, day.free_places))
+
+    def test_expire_after_shrink_capped(self):
+        hold = self.shrunk_hall_hold()
+        SeatHold.objects.update(expires=timezone.now())
+        SeatHold.expire()
+        self.assertEqual(1, SessionDay.objects.get(session=hold.session, date=date(2021, 10, 4)).free_places)
+
+    def test_rebuild_repairs_drift(self):
+        SessionDay.objects.filter(session_id=1).delete()
+        SessionDay.objects.filter(session_id=2).update(booked=0, free_places=3)
+        call_command("rebuild_session_days", stdout=StringIO())
+        day = SessionDay.objects.get(session_id=1, date=date(2021, 10, 4))
+        self.assertEqual((3, 3, 0), (day.capacity, day.booked, day.free_places))
+        self.assertEqual(26, SessionDay.objects.filter(session_id=1).count())
+        self.assertEqual(SessionDay.rebuild(Session.objects.all()), {"created": 0, "updated": 0, "deleted": 0})
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_rebuild_locks_days(self):
+        with CaptureQueriesContext(connection) as queries:
+            SessionDay.rebuild([self.session])
+        self.assertTrue(any("cinema_sessionday" in query["sql"] and "FOR UPDATE" in query["sql"]
+                            for query in queries))
+
+
+class TestSeatHold(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.session = Session.objects.get(id=3)
+        self.user = MyUser.objects.get(id=1)
+        self.hold = SeatHold.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=2)
+
+    def test_hold_claims_places(self):
+        self.assertEqual(1, SessionDay.get_free_places(self.session, date(2021, 10, 4)))
+
+    def test_no_free_places(self):
+        with self.assertRaises(NoFreePlacesException):
+            SeatHold.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=2)
+
+    def test_release(self):
+        self.hold.release()
+        self.hold.release()
+        self.assertEqual(3, SessionDay.get_free_places(self.session, date(2021, 10, 4)))
+
+    def test_hold_is_not_booked(self):
+        self.assertEqual(0, SessionDay.objects.get(session=self.session, date=date(2021, 10, 4)).booked)
+
+    def test_confirm(self):
+        booked_session = self.hold.confirm()
+        self.assertEqual(2, SessionDay.objects.get(session=self.session, date=date(2021, 10, 4)).booked)
+        self.assertEqual(2, booked_session.places)
+        self.assertEqual(1, SessionDay.get_free_places(self.session, date(2021, 10, 4)))
+        self.assertEqual(9980, MyUser.objects.get(id=1).wallet)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_confirm_expired(self):
+        SeatHold.objects.update(expires=timezone.now())
+        with self.assertRaises(HoldExpiredException):
+            self.hold.confirm()
+
+    def test_expire(self):
+        SeatHold.objects.create(session=self.session, user=self.user, date=date(2021, 10, 5), places=1)
+        SeatHold.objects.update(expires=timezone.now())
+        self.assertEqual(2, SeatHold.expire(batch_size=1))
+        self.assertEqual(3, SessionDay.get_free_places(self.session, date(2021, 10, 4)))
+        self.assertEqual(3, SessionDay.get_free_places(self.session, date(2021, 10, 5)))
+
+
+class TestBookingFlags(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.session = Session.objects.get(id=3)
+        self.user = MyUser.objects.get(id=1)
+
+    def test_loaded_bookings_flagged(self):
+        self.assertTrue(Session.objects.get(id=1).has_bookings)
+        self.assertTrue(Hall.objects.get(id=2).has_bookings)
+        self.assertFalse(Hall.objects.get(id=3).has_bookings)
+
+    def test_booking_sets_flags(self):
+        BookedSession.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=1)
+        self.assertTrue(Session.objects.get(id=3).has_bookings)
+        self.assertTrue(Hall.objects.get(id=3).has_bookings)
+
+    def test_stale_instance_keeps_flag(self):
+        hall = Hall.objects.get(id=3)
+        BookedSession.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=1)
+        with self.assertRaises(BookedSessionExistsException):
+            hall.save()
+        self.assertTrue(Hall.objects.get(id=3).has_bookings)
+
+    def test_delete_clears_flags(self):
+        BookedSession.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4),
+                                     places=1).delete()
+        self.assertFalse(Session.objects.get(id=3).has_bookings)
+        self.assertFalse(Hall.objects.get(id=3).has_bookings)
+
+    def test_reconcile_flags(self):
+        Session.objects.update(has_bookings=False)
+        Hall.objects.update(has_bookings=True)
+        BookedSession.reconcile_flags()
+        self.assertEqual([True, True, False], list(Session.objects.order_by("id").values_list("has_bookings", flat=True)))
+        self.assertEqual([False, True, False], list(Hall.objects.order_by("id").values_list("has_bookings", flat=True)))
+
+
+class TestSpending(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.session = Session.objects.get(id=3)
+        self.user = MyUser.objects.get(id=1)
+
+    def test_loaded_bookings_counted(self):
+        self.assertEqual([10, 10, 10], list(BookedSession.objects.filter(user=self.user).values_list("amount", flat=True)))
+        self.assertEqual(30, self.user.total_spent)
+
+    def test_booking_adds_amount(self):
+        booked_session = BookedSession.objects.create(session=self.session, user=self.user,
+                                                      date=date(2021, 10, 4), places=2)
+        self.assertEqual(self.session.price * 2, booked_session.amount)
+        self.assertEqual(30 + booked_session.amount, self.user.total_spent)
+        self.assertEqual(self.user.total_spent, MyUser.objects.get(id=1).total_spent)
+
+    def test_failed_booking_adds_nothing(self):
+        self.user.wallet = 0
+        self.user.save()
+        with self.assertRaises(NotEnoughMoneyException):
+            BookedSession.objects.create(session=self.session, user=self.user, date=date(2021, 10, 4), places=1)
+        self.assertEqual(30, MyUser.objects.get(id=1).total_spent)
+
+    def test_price_change_keeps_amounts(self):
+        Session.objects.filter(id=1).update(price=1000)
+        self.assertEqual(30, MyUser.objects.get(id=1).total_spent)
+        self.assertEqual(30, BookedSession.objects.filter(user=self.user).aggregate(total=Sum("amount"))["total"])
+
+    def test_delete_subtracts_amount(self):
+        BookedSession.objects.get(id=1).delete()
+        self.assertEqual(20, MyUser.objects.get(id=1).total_spent)
+
+    def test_reconcile_spending(self):
+        MyUser.objects.update(total_spent=0)
+        BookedSession.reconcile_spending()
+        self.assertEqual(30, MyUser.objects.get(id=1).total_spent)
+        self.assertEqual(0, MyUser.objects.get(id=2).total_spent)
+
+
+@skipIf(connection.vendor == "sqlite", "SQLite locks the whole database for every write")
+class TestConcurrentBooking(TransactionTestCase):
+
+    def setUp(self) -> None:
+        hall = Hall.objects.create(name="hall", size=100)
+        self.session = Session.objects.create(start_time=time(12), end_time=time(14),
+                                              start_date=date.today(), end_date=date.today() + timedelta(days=10),
+                                              hall=hall, price=10)
+        self.user = MyUser.objects.create_user(username="darkin", password="1", wallet=25)
+        self.errors = []
+
+    def book(self, barrier):
+        user = MyUser.objects.get(id=self.user.id)
+        barrier.wait()
+        try:
+            BookedSession.objects.create(session=self.session, user=user, date=date.today(), places=1)
+        except NotEnoughMoneyException:
+            pass
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            connection.close()
+
+    def test_wallet_never_negative(self):
+        barrier = Barrier(5)
+        threads = [Thread(target=self.book, args=[barrier]) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], self.errors)
+        self.assertEqual(2, BookedSession.objects.filter(user=self.user).count())
+        self.assertEqual(5, MyUser.objects.get(id=self.user.id).wallet)
 
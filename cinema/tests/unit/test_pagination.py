@@ -0,0 +1,122 @@
+from datetime import date, time
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from customuser.models import MyUser
+from cinema.models import Hall, Session, BookedSession
+from cinema.pagination import paginate, encode_cursor
+
+
+class TestKeysetPagination(TestCase):
+    def setUp(self) -> None:
+        hall = Hall.objects.create(name="hall", size=10)
+        sessions = []
+        for day in range(1, 6):
+            for hour in (10, 12, 14):
+                sessions.append(Session(start_time=time(hour), end_time=time(hour, 30), start_date=date(2021, 10, day),
+                                        end_date=date(2021, 10, day), hall=hall, price=10))
+        Session.objects.bulk_create(sessions)
+        self.ordering = ["start_date", "start_time", "id"]
+        self.expected = list(Session.objects.order_by(*self.ordering))
+
+    def walk(self, page_size):
+        pages = [paginate(Session.objects.all(), self.ordering, None, page_size)]
+        while pages[-1].has_next():
+            pages.append(paginate(Session.objects.all(), self.ordering, pages[-1].next_cursor, page_size))
+        return pages
+
+    def test_forward(self):
+        pages = self.walk(4)
+        self.assertEqual(self.expected, [session for page in pages for session in page])
+        self.assertEqual(4, len(pages))
+        self.assertFalse(pages[0].has_previous())
+
+    def test_backward(self):
+        pages = self.walk(4)
+        page = paginate(Session.objects.all(), self.ordering, pages[-1].previous_cursor, 4)
+        self.assertEqual(pages[-2].object_list, page.object_list)
+        page = paginate(Session.objects.all(), self.ordering, pages[1].previous_cursor, 4)
+        self.assertEqual(pages[0].object_list, page.object_list)
+        self.assertFalse(page.has_previous())
+
+    def test_ties_on_first_field(self):
+        pages = self.walk(2)
+        self.assertEqual(self.expected, [session for page in pages for session in page])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            paginate(Session.objects.all(), self.ordering, "garbage", 4)
+        with self.assertRaises(ValueError):
+            paginate(Session.objects.all(), self.ordering, encode_cursor([1]), 4)
+
+    def test_cursor_with_bad_values(self):
+        for values in (["x", "y", 1], [1, 2, 3], ["2021-10-01", "10:00", "x"], ["2021-10-01", None, 1]):
+            with self.assertRaises(ValueError):
+                paginate(Session.objects.all(), self.ordering, encode_cursor(values), 4)
+
+
+class TestKeysetViews(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.user = MyUser.objects.get(id=1)
+        session = Session.objects.get(id=3)
+        for day in range(5, 10):
+            BookedSession.objects.create(user=self.user, session=session, date=date(2021, 10, day), places=1)
+        self.expected = list(BookedSession.objects.filter(user=self.user).order_by("date", "id"))
+
+    def test_html_cursor(self):
+        self.client.force_login(self.user)
+        url = reverse("cinema:bookedsessionlist")
+        response = self.client.get(url)
+        self.assertEqual(self.expected, response.context_data["object_list"])
+        self.assertIsNone(response.context_data["paginator"])
+
+    def test_html_page_number(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("cinema:bookedsessionlist"), {"page": 1})
+        self.assertEqual(self.expected, list(response.context_data["object_list"]))
+        self.assertEqual(1, response.context_data["paginator"].num_pages)
+
+    def test_html_invalid_cursor(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("cinema:bookedsessionlist"), {"cursor": "garbage"})
+        self.assertEqual(404, response.status_code)
+
+    def test_html_cursor_with_bad_values(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("cinema:sessionlist"), {"cursor": encode_cursor(["x", "y", 1])})
+        self.assertEqual(404, response.status_code)
+        response = self.client.get(reverse("cinema:bookedsessionlist"), {"cursor": encode_cursor(["x", 1])})
+        self.assertEqual(404, response.status_code)
+
+    def test_api_cursor(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse("api:my-booked-sessions"), {"limit": 5})
+        self.assertEqual(8, response.data["count"])
+        self.assertEqual(5, len(response.data["results"]) - 2)
+        response = client.get(response.data["next"])
+        self.assertNotIn("count", response.data)
+        self.assertEqual([str(elem.date) for elem in self.expected[5:]],
+                         [elem["date"] for elem in response.data["results"][:-2]])
+        self.assertIsNone(response.data["next"])
+        self.assertIsNotNone(response.data["previous"])
+
+    def test_api_cursor_with_bad_values(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse("api:my-booked-sessions"), {"cursor": encode_cursor(["x", 1])})
+        self.assertEqual(404, response.status_code)
+        response = client.get(reverse("api:my-booked-sessions"), {"cursor": encode_cursor(["2021-10-05", "x"])})
+        self.assertEqual(404, response.status_code)
+
+    def test_api_offset(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse("api:my-booked-sessions"), {"limit": 5, "offset": 5})
+        self.assertEqual(8, response.data["count"])
+        self.assertEqual(3, len(response.data["results"]) - 2)
@@ -1,8 +1,9 @@
+import json
 from datetime import date, time
 from django.test import TestCase, RequestFactory
 from django.urls import reverse
 from customuser.models import MyUser
-from cinema.models import Session, BookedSession
+from cinema.models import Session, BookedSession, SeatHold
 from cinema.views import CreateBookedSessionView
 
 
@@ -61,6 +62,7 @@ class TestFormIsValid(TestCase):
         self.client.force_login(self.user)
         self.client.post(reverse("cinema:booksession", args=[self.session, date(2021, 10, 4)]),
                          data={"places": 1})
+        self.client.post(reverse("cinema:confirmseathold", args=[SeatHold.objects.get(user=self.user).pk]))
 
     def test_is_created(self):
         self.assertTrue(len(BookedSession.objects.all()))
@@ -166,4 +168,56 @@ class TestBookedSessionListContextData(TestCase):
         self.client.force_login(self.user2)
         response = self.client.get(reverse("cinema:bookedsessionlist"))
         sessions = response.context_data["object_list"]
-        self.assertEqual(0, len(sessions))
\ No newline at end of file
+        self.assertEqual(0, len(sessions))
+
+
+class TestBookedSessionsExport(TestCase):
+    fixtures = ["fixtures/users.json",
+                "fixtures/halls.json",
+                "fixtures/sessions.json",
+                "fixtures/booked_sessions.json"]
+
+    def setUp(self) -> None:
+        self.admin = MyUser.objects.get(id=1)
+        self.user = MyUser.objects.get(id=3)
+
+    def export(self, name, export_format):
+        response = self.client.get(reverse(name, args=[export_format]))
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv_has_only_own_bookings(self):
+        self.client.force_login(self.user)
+        response, content = self.export("cinema:bookedsessionexport", "csv")
+        lines = content.splitlines()
+        self.assertEqual("text/csv", response["Content-Type"])
+        self.assertEqual('attachment; filename="booked-sessions.csv"', response["Content-Disposition"])
+        self.assertEqual("id,user,date,session,hall,start_time,end_time,places,amount", lines[0])
+        self.assertEqual(["4", "5"], [line.split(",")[0] for line in lines[1:]])
+
+    def test_jsonl_rows(self):
+        self.client.force_login(self.user)
+        response, content = self.export("cinema:bookedsessionexport", "jsonl")
+        rows = [json.loads(line) for line in content.splitlines()]
+        booked_session = BookedSession.objects.select_related("session__hall").get(id=4)
+        self.assertEqual({"id": 4, "user": "darkin2", "date": "2021-10-04", "session": booked_session.session_id,
+                          "hall": booked_session.session.hall.name,
+                          "start_time": booked_session.session.start_time.isoformat(),
+                          "end_time": booked_session.session.end_time.isoformat(),
+                          "places": booked_session.places, "amount": booked_session.amount}, rows[0])
+        self.assertEqual(2, len(rows))
+
+    def test_unknown_format(self):
+        self.client.force_login(self.user)
+        self.assertEqual(404, self.client.get(reverse("cinema:bookedsessionexport", args=["xml"])).status_code)
+
+    def test_anonymous_redirected(self):
+        self.assertEqual(302, self.client.get(reverse("cinema:bookedsessionexport", args=["csv"])).status_code)
+
+    def test_admin_export_has_all_bookings(self):
+        self.client.force_login(self.admin)
+        response, content = self.export("cinema:allbookedsessionexport", "csv")
+        self.assertEqual(BookedSession.objects.count() + 1, len(content.splitlines()))
+
+    def test_admin_export_forbidden(self):
+        self.client.force_login(self.user)
+        self.assertEqual(403, self.client.get(reverse("cinema:allbookedsessionexport", args=["csv"])).status_code)
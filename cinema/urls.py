@@ -17,9 +17,16 @@ urlpatterns = [
     path("createsession/", views.CreateSessionView.as_view(), name="createsession"),
     path("updatesession/<int:pk>/", views.UpdateSessionView.as_view(), name="updatesession"),
     path("booksession/<session:s>/<date:date>/", views.CreateBookedSessionView.as_view(), name="booksession"),
+    path("seathold/<int:pk>/", views.SeatHoldView.as_view(), name="seathold"),
+    path("seathold/<int:pk>/confirm/", views.ConfirmSeatHoldView.as_view(), name="confirmseathold"),
+    path("seathold/<int:pk>/release/", views.ReleaseSeatHoldView.as_view(), name="releaseseathold"),
     path("sessionlist/", views.SessionList.as_view(), name="sessionlist"),
     path("halllist/", views.HallList.as_view(), name="halllist"),
     path("clientsessionlist/<date:date>/<str:sort>/", views.ClientSessionList.as_view(), name="clientsessionlist"),
     path("clientsessionlist/<date:date>/", views.ClientSessionList.as_view(), name="clientsessionlist"),
-    path("bookedsessionlist/", views.UserBookedSessionsList.as_view(), name="bookedsessionlist")
+    path("bookedsessionlist/", views.UserBookedSessionsList.as_view(), name="bookedsessionlist"),
+    path("bookedsessionexport/<str:export_format>/", views.UserBookedSessionsExport.as_view(),
+         name="bookedsessionexport"),
+    path("allbookedsessionexport/<str:export_format>/", views.BookedSessionsExport.as_view(),
+         name="allbookedsessionexport")
 ]
\ No newline at end of file
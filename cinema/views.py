@@ -1,14 +1,26 @@
 from datetime import datetime, date
-from django.views.generic import CreateView, UpdateView, ListView
+from django.conf import settings
+from django.views.generic import CreateView, UpdateView, ListView, DetailView, View
+from django.core.paginator import Page
+from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.urls import reverse
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import redirect
-from django.db.models import Sum, F
-from .forms import HallForm, SessionForm, BookedSessionForm
-from . import exceptions
+from django.shortcuts import redirect, get_object_or_404
+from django.utils import timezone
+from .forms import HallForm, SessionForm, SeatHoldForm
+from . import exceptions, listing_cache, exports
 from .misc import SuperUserRequired
-from .models import Hall, Session, BookedSession
+from .pagination import KeysetPaginationMixin
+from .models import Hall, Session, BookedSession, SessionDay, SeatHold
+
+BOOKING_FAIL_MESSAGES = {
+    exceptions.NoFreePlacesException: "No free places",
+    exceptions.DateExpiredException: "Date expired",
+    exceptions.IncorrectDataException: "Incorrect data",
+    exceptions.NotEnoughMoneyException: "Not enough money",
+    exceptions.HoldExpiredException: "Hold expired",
+}
 
 
 class CreateHallView(SuperUserRequired, CreateView):
@@ -74,7 +86,7 @@ class UpdateSessionView(SuperUserRequired, UpdateView):
 
 
 class CreateBookedSessionView(LoginRequiredMixin, CreateView):
-    form_class = BookedSessionForm
+    form_class = SeatHoldForm
     template_name = "create_booked_session.html"
 
     def get_context_data(self, **kwargs):
@@ -83,35 +95,57 @@ class CreateBookedSessionView(LoginRequiredMixin, CreateView):
         date = self.kwargs["date"]
         context["session"] = session
         context["date"] = date
-        booked_sessions = BookedSession.objects.filter(session=session,
-                                                       date=date).aggregate(Sum("places"))
-        places = booked_sessions["places__sum"]
-        if not places:
-            places = context["session"].hall.size
-        else:
-            places = context["session"].hall.size - places
-        context["places"] = places
+        context["places"] = SessionDay.get_free_places(session, date)
         return context
 
     def form_valid(self, form):
+        # Seats are only held here, the money is taken when the hold is confirmed
         try:
-            booked_session = form.save(commit=False)
-            booked_session.user = self.request.user
-            booked_session.session = self.kwargs["s"]
-            booked_session.date = self.kwargs["date"]
-            booked_session.save()
-        except exceptions.NoFreePlacesException:
-            messages.add_message(self.request, messages.ERROR, "No free places")
-            return redirect(self.request.path_info)
-        except exceptions.DateExpiredException:
-            messages.add_message(self.request, messages.ERROR, "Date expired")
-            return redirect(self.request.path_info)
-        except exceptions.NotEnoughMoneyException:
-            messages.add_message(self.request, messages.ERROR, "Not enough money")
+            hold = form.save(commit=False)
+            hold.user = self.request.user
+            hold.session = self.kwargs["s"]
+            hold.date = self.kwargs["date"]
+            hold.save()
+        except tuple(BOOKING_FAIL_MESSAGES) as e:
+            messages.add_message(self.request, messages.ERROR, BOOKING_FAIL_MESSAGES[type(e)])
             return redirect(self.request.path_info)
-        else:
-            messages.add_message(self.request, messages.SUCCESS, "Session was booked")
-            return redirect("/")
+        return redirect("cinema:seathold", pk=hold.pk)
+
+
+class SeatHoldView(LoginRequiredMixin, DetailView):
+    model = SeatHold
+    template_name = "seat_hold.html"
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user, expires__gt=timezone.now()). \
+            select_related("session__hall")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["price"] = self.object.session.price * self.object.places
+        return context
+
+
+class ConfirmSeatHoldView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        hold = get_object_or_404(SeatHold.objects.select_related("session"), pk=pk, user=request.user)
+        try:
+            hold.confirm()
+        except tuple(BOOKING_FAIL_MESSAGES) as e:
+            # A hold that can't be paid for gives its seats back right away instead of at expiry
+            hold.release()
+            messages.add_message(request, messages.ERROR, BOOKING_FAIL_MESSAGES[type(e)])
+            return redirect("cinema:booksession", hold.session, hold.date)
+        messages.add_message(request, messages.SUCCESS, "Session was booked")
+        return redirect("/")
+
+
+class ReleaseSeatHoldView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        hold = get_object_or_404(SeatHold, pk=pk, user=request.user)
+        hold.release()
+        messages.add_message(request, messages.SUCCESS, "Seats were released")
+        return redirect("/")
 
 
 class HallList(SuperUserRequired, ListView):
@@ -120,10 +154,15 @@ class HallList(SuperUserRequired, ListView):
     paginate_by = 50
 
 
-class SessionList(SuperUserRequired, ListView):
+class SessionList(SuperUserRequired, KeysetPaginationMixin, ListView):
     template_name = "session_list.html"
     model = Session
     paginate_by = 50
+    keyset_ordering = ["start_date", "start_time", "id"]
+
+    def get_queryset(self):
+        return super().get_queryset().select_related("hall"). \
+            only("start_time", "end_time", "start_date", "end_date", "weekdays", "price", "hall__name")
 
 
 class ClientSessionList(ListView):
@@ -131,39 +170,76 @@ class ClientSessionList(ListView):
     template_name = "user_session_list.html"
     paginate_by = 50
 
+    # The page greets signed in users with their wallet, so only anonymous pages are validated by the date stamp
+    @method_decorator(listing_cache.conditional(lambda kwargs: kwargs["date"], anonymous_only=True))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         query_set = super().get_queryset()
         url_date = self.kwargs["date"]
-        query_set = query_set.filter(start_date__lte=url_date, end_date__gte=url_date)
+        query_set = query_set.running_on(url_date).with_free_places().select_related("hall"). \
+            only("start_time", "end_time", "start_date", "end_date", "price", "hall__name")
         sort_options = ["start_time", "price"]
         sort = self.kwargs.get("sort", None)
         if sort in sort_options:
             query_set = query_set.order_by(sort)
         return query_set
 
+    def paginate_queryset(self, queryset, page_size):
+        page = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+        self.listing_version = listing_cache.version(self.kwargs["date"])
+        key = listing_cache.make_key("html", self.kwargs["date"], self.kwargs.get("sort", None), page,
+                                     current=self.listing_version)
+        cached = listing_cache.fetch(key)
+        if cached is None:
+            paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+            cached = (paginator.count, page.number, list(object_list))
+            listing_cache.store(key, cached)
+        count, number, object_list = cached
+        paginator = self.get_paginator(queryset, page_size, orphans=self.get_paginate_orphans(),
+                                       allow_empty_first_page=self.get_allow_empty())
+        paginator.count = count
+        page = Page(object_list, number, paginator)
+        return paginator, page, object_list, page.has_other_pages()
+
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=None, **kwargs)
         url_date = self.kwargs["date"]
         context["date"] = url_date
+        # The rendered table is cached under the version its rows were read with, Buy links only depend on signing in
+        context["sort"] = self.kwargs.get("sort", None)
+        context["listing_version"] = self.listing_version
+        context["listing_cache_alias"] = settings.LISTING_CACHE_ALIAS
+        context["cache_timeout"] = settings.LISTING_CACHE_TIMEOUT
         return context
 
 
-class UserBookedSessionsList(LoginRequiredMixin, ListView):
+class UserBookedSessionsList(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = BookedSession
     template_name = "booked_sessions_list.html"
     paginate_by = 50
+    keyset_ordering = ["date", "id"]
 
     def get_queryset(self):
         query_set = super().get_queryset()
-        query_set = query_set.filter(user=self.request.user)
+        query_set = query_set.filter(user=self.request.user).select_related("session__hall"). \
+            only("date", "places", "session__start_time", "session__end_time", "session__start_date",
+                 "session__end_date", "session__price", "session__hall__name")
         return query_set
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=None, **kwargs)
-        total_spent = context["object_list"].aggregate(total=Sum(F("session__price") * F("places")))["total"]
-        if not total_spent:
-            total_spent = 0
-        context["total_spent"] = total_spent
+        context["total_spent"] = self.request.user.total_spent
         return context
 
 
+class UserBookedSessionsExport(LoginRequiredMixin, View):
+    def get(self, request, export_format):
+        return exports.export_response(BookedSession.objects.filter(user=request.user), export_format,
+                                       "booked-sessions")
+
+
+class BookedSessionsExport(SuperUserRequired, View):
+    def get(self, request, export_format):
+        return exports.export_response(BookedSession.objects.all(), export_format, "all-booked-sessions")
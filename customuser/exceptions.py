@@ -0,0 +1,2 @@
+class ImmutableWalletEntryException(Exception):
+    pass
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from customuser.models import MyUser, WalletSnapshot
+
+
+class Command(BaseCommand):
+    help = "Snapshot wallet ledger balances and report drift against MyUser.wallet"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = MyUser.objects.order_by("id").values_list("id", flat=True)
+        last_id = 0
+        drifted = 0
+        while True:
+            chunk = list(user_ids.filter(id__gt=last_id)[:options["chunk_size"]])
+            if not chunk:
+                break
+            last_id = chunk[-1]
+            for user_id, drift in WalletSnapshot.take(chunk).items():
+                drifted += 1
+                self.stdout.write(f"User {user_id}: wallet differs from ledger by {drift}")
+        self.stdout.write(f"Snapshots rebuilt, {drifted} users with drift")
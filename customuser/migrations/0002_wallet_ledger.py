@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-18 07:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_wallets(apps, schema_editor):
+    MyUser = apps.get_model("customuser", "MyUser")
+    WalletEntry = apps.get_model("customuser", "WalletEntry")
+    WalletEntry.objects.bulk_create([
+        WalletEntry(user_id=user_id, amount=wallet)
+        for user_id, wallet in MyUser.objects.exclude(wallet=0).values_list("id", "wallet").iterator()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0008_seat_hold'),
+        ('customuser', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('booked_session', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='wallet_entries', to='cinema.bookedsession')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WalletSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.IntegerField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('last_entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='customuser.walletentry')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='walletsnapshot',
+            index=models.Index(fields=['user', 'last_entry'], name='customuser__user_id_acee32_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='walletentry',
+            index=models.Index(fields=['user', 'id'], name='customuser__user_id_e88a0f_idx'),
+        ),
+        migrations.RunPython(open_wallets, migrations.RunPython.noop),
+    ]
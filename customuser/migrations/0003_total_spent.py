@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customuser', '0002_wallet_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='myuser',
+            name='total_spent',
+            field=models.IntegerField(default=0),
+        ),
+    ]
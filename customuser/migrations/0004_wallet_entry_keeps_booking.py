@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-18 08:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0015_booking_amount'),
+        ('customuser', '0003_total_spent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='walletentry',
+            name='booked_session',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='wallet_entries', to='cinema.bookedsession'),
+        ),
+    ]
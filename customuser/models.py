@@ -1,7 +1,95 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
+from . import exceptions
 
 
 class MyUser(AbstractUser):
     wallet = models.IntegerField(default=10000, validators=[MinValueValidator(0)])
+    total_spent = models.IntegerField(default=0)
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if created and self.wallet:
+                WalletEntry.objects.create(user=self, amount=self.wallet)
+
+    def debit(self, amount):
+        # Conditional update touches only the money columns and can't drive the wallet below zero
+        debited = MyUser.objects.filter(pk=self.pk, wallet__gte=amount).update(wallet=F("wallet") - amount,
+                                                                                total_spent=F("total_spent") + amount)
+        if debited:
+            self.refresh_from_db(fields=["wallet", "total_spent"])
+        return bool(debited)
+
+    def ledger_balance(self):
+        snapshot = self.wallet_snapshots.order_by("-last_entry_id").first()
+        entries = self.wallet_entries.all()
+        balance = 0
+        if snapshot:
+            balance = snapshot.balance
+            entries = entries.filter(id__gt=snapshot.last_entry_id)
+        return balance + (entries.aggregate(Sum("amount"))["amount__sum"] or 0)
+
+
+class WalletEntry(models.Model):
+    user = models.ForeignKey(MyUser, on_delete=models.CASCADE, related_name="wallet_entries")
+    amount = models.IntegerField()
+    # Entries outlive their booking and keep its id, deleting a booking must not write to the ledger
+    booked_session = models.ForeignKey("cinema.BookedSession", on_delete=models.DO_NOTHING, db_constraint=False,
+                                       null=True, related_name="wallet_entries")
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "id"])]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise exceptions.ImmutableWalletEntryException
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise exceptions.ImmutableWalletEntryException
+
+
+class WalletSnapshot(models.Model):
+    user = models.ForeignKey(MyUser, on_delete=models.CASCADE, related_name="wallet_snapshots")
+    balance = models.IntegerField()
+    last_entry = models.ForeignKey(WalletEntry, on_delete=models.CASCADE, related_name="+")
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "last_entry"])]
+
+    @classmethod
+    @transaction.atomic
+    def take(cls, user_ids):
+        # Every ledger entry is written by a transaction that already holds its user row (insert or debit). Holding
+        # those locks while summing means no entry below the snapshot's last id can still be waiting to commit.
+        user_ids = list(MyUser.objects.select_for_update().filter(id__in=user_ids).order_by("id")
+                        .values_list("id", flat=True))
+        latest = cls.objects.filter(user=OuterRef("pk")).order_by("-last_entry_id")
+        users = MyUser.objects.filter(id__in=user_ids).annotate(
+            snapshot_balance=Coalesce(Subquery(latest.values("balance")[:1]), 0),
+            snapshot_entry=Coalesce(Subquery(latest.values("last_entry_id")[:1]), 0),
+        )
+        entries = WalletEntry.objects.filter(user=OuterRef("pk"), id__gt=OuterRef("snapshot_entry")) \
+            .order_by().values("user")
+        users = users.annotate(
+            entries_sum=Subquery(entries.annotate(total=Sum("amount")).values("total")),
+            entries_last=Subquery(entries.annotate(last=Max("id")).values("last")),
+        ).values_list("id", "wallet", "snapshot_balance", "entries_sum", "entries_last")
+
+        snapshots = []
+        drift = {}
+        for user_id, wallet, balance, entries_sum, entries_last in users:
+            balance += entries_sum or 0
+            if entries_last:
+                snapshots.append(cls(user_id=user_id, balance=balance, last_entry_id=entries_last))
+            if balance != wallet:
+                drift[user_id] = wallet - balance
+        cls.objects.bulk_create(snapshots)
+        return drift
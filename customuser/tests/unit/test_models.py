@@ -1,5 +1,10 @@
-from django.test import TestCase
-from customuser.models import MyUser
+from datetime import date, time, timedelta
+from django.db import connection
+from django.test import TestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from customuser.models import MyUser, WalletEntry, WalletSnapshot
+from customuser.exceptions import ImmutableWalletEntryException
+from cinema.models import Hall, Session, BookedSession
 from django.core.exceptions import ValidationError
 
 
@@ -32,3 +37,66 @@ class TestCustomUser(TestCase):
         self.generated_user_wallet.save()
         user = MyUser.objects.get(username="user2")
         self.assertEqual(10000, user.wallet)
+
+    def test_debit(self):
+        self.correct_user_wallet.save()
+        self.assertTrue(self.correct_user_wallet.debit(40))
+        self.assertEqual(60, MyUser.objects.get(username="user13").wallet)
+
+    def test_debit_not_enough_money(self):
+        self.correct_user_wallet.save()
+        self.assertFalse(self.correct_user_wallet.debit(101))
+        self.assertEqual(100, MyUser.objects.get(username="user13").wallet)
+
+
+class TestWalletLedger(TestCase):
+
+    def setUp(self) -> None:
+        self.user = MyUser.objects.create_user(username="darkin", password="1", wallet=100)
+        hall = Hall.objects.create(name="hall", size=10)
+        self.session = Session.objects.create(start_time=time(12), end_time=time(14),
+                                              start_date=date.today(), end_date=date.today() + timedelta(days=10),
+                                              hall=hall, price=10)
+
+    def test_opening_entry(self):
+        self.assertEqual(100, self.user.ledger_balance())
+
+    def test_booking_entry(self):
+        booked_session = BookedSession.objects.create(session=self.session, user=self.user,
+                                                      date=date.today(), places=2)
+        self.assertEqual(-20, WalletEntry.objects.get(booked_session=booked_session).amount)
+        self.assertEqual(80, self.user.ledger_balance())
+
+    def test_booking_delete_keeps_entry(self):
+        booked_session = BookedSession.objects.create(session=self.session, user=self.user,
+                                                      date=date.today(), places=2)
+        booked_session_id = booked_session.id
+        with CaptureQueriesContext(connection) as queries:
+            booked_session.delete()
+        self.assertFalse(any("customuser_walletentry" in query["sql"] for query in queries))
+        self.assertEqual(-20, WalletEntry.objects.get(booked_session_id=booked_session_id).amount)
+
+    def test_entry_immutable(self):
+        entry = WalletEntry.objects.get(user=self.user)
+        with self.assertRaises(ImmutableWalletEntryException):
+            entry.save()
+        with self.assertRaises(ImmutableWalletEntryException):
+            entry.delete()
+
+    def test_snapshot(self):
+        self.assertEqual({}, WalletSnapshot.take([self.user.id]))
+        BookedSession.objects.create(session=self.session, user=self.user, date=date.today(), places=1)
+        self.assertEqual({}, WalletSnapshot.take([self.user.id]))
+        self.assertEqual(90, WalletSnapshot.objects.order_by("-last_entry_id").first().balance)
+        self.assertEqual(90, self.user.ledger_balance())
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_snapshot_locks_users(self):
+        with CaptureQueriesContext(connection) as queries:
+            WalletSnapshot.take([self.user.id])
+        self.assertTrue(any("customuser_myuser" in query["sql"] and "FOR UPDATE" in query["sql"]
+                            for query in queries))
+
+    def test_drift(self):
+        MyUser.objects.filter(id=self.user.id).update(wallet=150)
+        self.assertEqual({self.user.id: 50}, WalletSnapshot.take([self.user.id]))
@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'diplom.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from cinema.live import router  # noqa: E402
+
+application = router(django_application)
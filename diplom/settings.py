@@ -51,6 +51,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'cinema.references.identity_map_middleware',
 ]
 
 ROOT_URLCONF = 'diplom.urls'
@@ -143,6 +144,16 @@ LOGIN_REDIRECT_URL = "/"
 SESSION_COOKIE_AGE = 300
 SESSION_SAVE_EVERY_REQUEST = True
 TOKEN_EXPIRING_TIME = 60 * 5
+TOKEN_REFRESH_SLACK = 30
+IDEMPOTENCY_KEY_EXPIRING_TIME = 60 * 60 * 24
+SEAT_HOLD_TIME = 60 * 10
+LISTING_CACHE_ALIAS = "default"
+LISTING_CACHE_TIMEOUT = 60 * 60
+LIVE_SEATS_TRANSPORT = "cinema.live.LocalTransport"
+LIVE_SEATS_KEEPALIVE = 15
+ASYNC_DB_THREADS = 8
+EXPORT_CHUNK_SIZE = 2000
+HALL_CACHE_TIMEOUT = 30
 
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',